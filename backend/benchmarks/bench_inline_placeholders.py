@@ -0,0 +1,70 @@
+"""
+Micro-benchmark: inline placeholder substitution on base_contract.docx.
+
+Compares the legacy per-key `str.replace` loop with the single-pass
+regex engine (`substitute_placeholders`) on every paragraph text of
+the template.
+
+Run from backend/:
+    python -m benchmarks.bench_inline_placeholders
+"""
+from __future__ import annotations
+
+from timeit import repeat
+from typing import Dict, List
+
+from docx import Document
+
+from src.shared.generator_docx import substitute_placeholders
+from src.shared.placeholder_index import PLACEHOLDER_RE, iter_text_paragraphs
+
+TEMPLATE_PATH = "templates/base_contract.docx"
+
+
+def _legacy_replace(text: str, ctx: Dict[str, str]) -> str:
+    # Former replace_inline_placeholders loop (one scan per ctx key)
+    for key, value in ctx.items():
+        if not isinstance(value, str):
+            continue
+        placeholder = f"[{key}]"
+        if placeholder in text:
+            text = text.replace(placeholder, value)
+    return text
+
+
+def _load_texts() -> List[str]:
+    doc = Document(TEMPLATE_PATH)
+    return [p.text for p, _ in iter_text_paragraphs(doc.element)]
+
+
+def _build_ctx(texts: List[str]) -> Dict[str, str]:
+    # Every template placeholder plus the usual amount of unrelated keys
+    ctx: Dict[str, str] = {}
+    for text in texts:
+        for key in PLACEHOLDER_RE.findall(text):
+            ctx[key] = f"Wert für {key}"
+    for i in range(40):
+        ctx[f"UNUSED_KEY_{i}"] = "unused"
+    return ctx
+
+
+def main() -> None:
+    texts = _load_texts()
+    ctx = _build_ctx(texts)
+
+    assert [_legacy_replace(t, ctx) for t in texts] == [
+        substitute_placeholders(t, ctx)[0] for t in texts
+    ]
+
+    runs = 200
+    legacy = min(repeat(lambda: [_legacy_replace(t, ctx) for t in texts], number=runs, repeat=5))
+    single = min(repeat(lambda: [substitute_placeholders(t, ctx) for t in texts], number=runs, repeat=5))
+
+    print(f"paragraphs: {len(texts)}, ctx keys: {len(ctx)}")
+    print(f"legacy str.replace loop : {legacy / runs * 1e3:8.3f} ms/document")
+    print(f"single-pass regex       : {single / runs * 1e3:8.3f} ms/document")
+    print(f"speedup                 : {legacy / single:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark: lifecycle sweep of expired contracts against the local
+store (no Azure needed).
+
+Fills a temporary store with contracts spread over the last DAYS days,
+then deletes everything older than RETENTION_DAYS and reports what was
+deleted and how long it took.
+
+Run from backend/:
+    python -m benchmarks.bench_lifecycle_sweep
+"""
+from __future__ import annotations
+
+import tempfile
+import uuid
+from datetime import timedelta
+from time import perf_counter
+
+from src.shared.blob_names import partitioned_name, utc_today
+from src.shared.lifecycle import sweep_expired_contracts
+from src.shared.storage_backends import LocalStorageBackend
+
+DAYS = 40
+BLOBS_PER_DAY = 250
+BLOB_SIZE = 40 * 1024
+RETENTION_DAYS = 7
+LOOKBACK_DAYS = 30
+
+
+def main() -> None:
+    today = utc_today()
+    payload = bytes(BLOB_SIZE)
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = LocalStorageBackend(directory, shard_chars=2)
+        for offset in range(DAYS):
+            day = today - timedelta(days=offset)
+            for _ in range(BLOBS_PER_DAY):
+                store.save(partitioned_name(f"{uuid.uuid4().hex}.docx", day), payload)
+
+        start = perf_counter()
+        report = sweep_expired_contracts(store, RETENTION_DAYS, LOOKBACK_DAYS, today=today)
+        elapsed = perf_counter() - start
+
+        expected_days = min(DAYS - RETENTION_DAYS, LOOKBACK_DAYS)
+        print(f"stored          : {DAYS * BLOBS_PER_DAY} blobs over {DAYS} days")
+        print(f"deleted         : {report['deleted']} blobs in {len(report['partitions'])} partitions")
+        print(f"expected        : {expected_days * BLOBS_PER_DAY} blobs in {expected_days} partitions")
+        print(f"reclaimed       : {report['bytes'] / 1024 / 1024:.1f} MiB")
+        print(f"sweep           : {elapsed * 1e3:.1f} ms")
+        print(f"kept            : {sum(1 for _ in store._iter_files())} blobs")
+
+
+if __name__ == "__main__":
+    main()
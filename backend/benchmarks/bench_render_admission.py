@@ -0,0 +1,87 @@
+"""
+Benchmark: a burst of concurrent generate requests, with and without
+render admission control (no external service needed).
+
+Each request renders base_contract.docx from the sample masks (with a
+different rent per request, so none are coalesced). Without
+admission control every request is admitted and they all slow down
+together; with it, requests beyond the concurrency limit + wait queue
+are rejected at once (429) and the admitted ones keep a bounded
+latency.
+
+Run from backend/:
+    python -m benchmarks.bench_render_admission
+"""
+from __future__ import annotations
+
+import asyncio
+from time import perf_counter
+from typing import Dict, List
+
+from src.shared import admission
+from src.shared.admission import AdmissionRejected, RenderAdmission
+from src.shared.contract_service import prepare_contract, render_contract, warm_contract_service
+
+from benchmarks.sample_contract import sample_body
+
+BURST = 64
+LIMIT = 2
+QUEUE = 4
+QUEUE_TIMEOUT = 5.0
+
+
+async def _burst(jobs: List[Dict[str, object]]) -> Dict[str, object]:
+    latencies: List[float] = []
+    rejected = 0
+
+    async def one(job: Dict[str, object]) -> None:
+        nonlocal rejected
+        start = perf_counter()
+        try:
+            await render_contract(job)
+        except AdmissionRejected:
+            rejected += 1
+            return
+        latencies.append(perf_counter() - start)
+
+    start = perf_counter()
+    await asyncio.gather(*(one(job) for job in jobs))
+    latencies.sort()
+    return {
+        "elapsed": perf_counter() - start,
+        "ok": len(latencies),
+        "rejected": rejected,
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))],
+    }
+
+
+def _report(label: str, result: Dict[str, object]) -> None:
+    print(
+        f"{label:<22}: {result['ok']:>3} ok, {result['rejected']:>3} rejected (429), "
+        f"p50 {result['p50'] * 1e3:7.1f} ms, p99 {result['p99'] * 1e3:7.1f} ms, "
+        f"burst {result['elapsed']:.2f}s"
+    )
+
+
+def main() -> None:
+    warm_contract_service()
+    # Distinct bodies: identical ones would share one render (single flight)
+    jobs = []
+    for index in range(BURST):
+        job, error = prepare_contract(sample_body(1000 + index))
+        if error:
+            raise SystemExit(f"Sample body rejected: {error}")
+        jobs.append(job)
+
+    # Unlimited: everything admitted at once
+    admission._render_admission = RenderAdmission(limit=BURST, max_queue=0, max_wait=QUEUE_TIMEOUT)
+    _report("no admission control", asyncio.run(_burst(jobs)))
+
+    admission._render_admission = RenderAdmission(limit=LIMIT, max_queue=QUEUE, max_wait=QUEUE_TIMEOUT)
+    _report(f"limit {LIMIT}, queue {QUEUE}", asyncio.run(_burst(jobs)))
+    print(f"stats                 : {admission.get_render_admission_stats()}")
+
+
+if __name__ == "__main__":
+    main()
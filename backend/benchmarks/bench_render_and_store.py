@@ -0,0 +1,88 @@
+"""
+Benchmark: render base_contract.docx and store the result, without
+any external service (in-memory storage backend).
+
+Reports render-only and render + save throughput for every render
+backend, sequentially and with concurrent async requests.
+
+Run from backend/:
+    python -m benchmarks.bench_render_and_store
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+from time import perf_counter
+from typing import Dict
+
+from src.shared.generator_docx import generate_docx_from_template, warm_render_backend
+from src.shared.placeholder_index import PLACEHOLDER_RE, iter_text_paragraphs
+from src.shared.render_pool import render_docx_async
+from src.shared.storage import save_bytes_blob, save_bytes_blob_async, set_storage_backend
+from src.shared.storage_backends import MemoryStorageBackend
+from src.shared.template_cache import load_template
+
+TEMPLATE_PATH = "templates/base_contract.docx"
+RUNS = 100
+CONCURRENCY = 16
+
+
+def _build_ctx() -> Dict[str, object]:
+    doc = load_template(TEMPLATE_PATH)
+    ctx: Dict[str, object] = {}
+    for p, _ in iter_text_paragraphs(doc.element):
+        for key in PLACEHOLDER_RE.findall(p.text):
+            ctx[key] = f"Wert für {key}"
+    ctx["MIETE_BK_TABELLE"] = [(f"Position {i}", f"{i * 10},00 EUR") for i in range(1, 7)]
+    return ctx
+
+
+def _render(ctx) -> bytes:
+    return generate_docx_from_template(TEMPLATE_PATH, ctx, on_unknown_placeholder=lambda key: None)
+
+
+async def _concurrent(ctx) -> float:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one():
+        async with semaphore:
+            data = await render_docx_async(TEMPLATE_PATH, ctx)
+            await save_bytes_blob_async(data)
+
+    start = perf_counter()
+    await asyncio.gather(*(one() for _ in range(RUNS)))
+    return perf_counter() - start
+
+
+def main() -> None:
+    ctx = _build_ctx()
+    store = MemoryStorageBackend()
+    set_storage_backend(store)
+
+    for backend in ("python-docx", "xml", "plan"):
+        os.environ["DOCX_RENDER_BACKEND"] = backend
+        warm_render_backend([TEMPLATE_PATH])
+        _render(ctx)
+
+        start = perf_counter()
+        for _ in range(RUNS):
+            _render(ctx)
+        render_only = perf_counter() - start
+
+        start = perf_counter()
+        for _ in range(RUNS):
+            save_bytes_blob(_render(ctx))
+        render_and_save = perf_counter() - start
+
+        concurrent = asyncio.run(_concurrent(ctx))
+
+        print(f"[{backend}]")
+        print(f"  render only           : {render_only / RUNS * 1e3:8.2f} ms/contract")
+        print(f"  render + save         : {render_and_save / RUNS * 1e3:8.2f} ms/contract")
+        print(f"  async x{CONCURRENCY:<2} render + save: {RUNS / concurrent:8.1f} contracts/s")
+
+    print(f"stored blobs: {len(store.blobs)}")
+
+
+if __name__ == "__main__":
+    main()
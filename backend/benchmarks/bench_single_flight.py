@@ -0,0 +1,136 @@
+"""
+Benchmark: a burst of byte-identical generate_contract requests
+(double-clicks, client retries), against in-memory storage.
+
+Sends BURST identical requests at once and counts renders and uploads:
+with single-flight coalescing they share exactly one of each, with
+the result cache on and off, and in inline mode. Exits non-zero when
+more than one render or upload happens.
+
+Run from backend/:
+    python -m benchmarks.bench_single_flight
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import os
+from time import perf_counter
+from typing import Dict
+
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+import azure.functions as func  # noqa: E402
+
+import generate_contract  # noqa: E402
+from src.shared import contract_service  # noqa: E402
+from src.shared.storage import set_storage_backend  # noqa: E402
+from src.shared.storage_backends import MemoryStorageBackend  # noqa: E402
+
+from benchmarks.sample_contract import sample_body  # noqa: E402
+
+BURST = 50
+
+_counts: Dict[str, int] = {"renders": 0, "uploads": 0}
+
+
+class _CountingStore(MemoryStorageBackend):
+    async def save_async(self, blob_name, data, cache_control=None):
+        _counts["uploads"] += 1
+        return await super().save_async(blob_name, data, cache_control)
+
+
+@contextlib.contextmanager
+def _counting_renders():
+    render = contract_service.render_docx_async
+
+    async def counting_render(template_path, ctx):
+        _counts["renders"] += 1
+        return await render(template_path, ctx)
+
+    contract_service.render_docx_async = counting_render
+    try:
+        yield
+    finally:
+        contract_service.render_docx_async = render
+
+
+def _request(body: bytes, inline: bool) -> func.HttpRequest:
+    return func.HttpRequest(
+        "POST",
+        "http://localhost/api/generate_contract",
+        body=body,
+        params={"inline": "true"} if inline else {},
+    )
+
+
+async def _burst(body: bytes, inline: bool) -> Dict[str, object]:
+    _counts.update(renders=0, uploads=0)
+    start = perf_counter()
+    responses = await asyncio.gather(*(generate_contract.main(_request(body, inline)) for _ in range(BURST)))
+    elapsed = perf_counter() - start
+    # Inline mode stores in the background, after the responses
+    await contract_service.drain_background_saves()
+
+    succeeded = [response for response in responses if response.status_code == 200]
+    if inline:
+        distinct = {response.get_body() for response in succeeded}
+    else:
+        distinct = {json.loads(response.get_body())["fileId"] for response in succeeded}
+    return {
+        "statuses": sorted({response.status_code for response in responses}),
+        "distinct": len(distinct),
+        "elapsed": elapsed,
+        **_counts,
+    }
+
+
+def main() -> None:
+    cache_setting = os.environ.get("RESULT_CACHE_ENABLED")
+    try:
+        with _counting_renders():
+            failed = _run_scenarios()
+    finally:
+        # Leave the settings and storage as they were
+        if cache_setting is None:
+            os.environ.pop("RESULT_CACHE_ENABLED", None)
+        else:
+            os.environ["RESULT_CACHE_ENABLED"] = cache_setting
+        set_storage_backend(None)
+    print(f"single flight     : {contract_service.get_single_flight_stats()}")
+    if failed:
+        raise SystemExit(1)
+
+
+def _run_scenarios() -> bool:
+    failed = False
+    for index, (label, cache_enabled, inline) in enumerate((
+        ("result cache on", "true", False),
+        ("result cache off", "false", False),
+        ("inline, cache on", "true", True),
+    )):
+        os.environ["RESULT_CACHE_ENABLED"] = cache_enabled
+        set_storage_backend(_CountingStore())
+        # Different bodies per scenario, so no earlier result is reused
+        body = sample_body(1001 + index)
+        result = asyncio.run(_burst(json.dumps(body).encode("utf-8"), inline))
+
+        ok = (
+            result["statuses"] == [200]
+            and result["renders"] == 1
+            and result["uploads"] == 1
+            and result["distinct"] == 1
+        )
+        failed = failed or not ok
+        print(
+            f"{label:<18}: {BURST} requests -> {result['renders']} render(s), {result['uploads']} upload(s), "
+            f"{result['distinct']} distinct result(s), status {result['statuses']}, "
+            f"{result['elapsed'] * 1e3:.0f} ms  {'OK' if ok else 'FAILED'}"
+        )
+
+    return failed
+
+
+if __name__ == "__main__":
+    main()
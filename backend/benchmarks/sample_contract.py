@@ -0,0 +1,39 @@
+"""
+Sample generate_contract body shared by the benchmarks.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict
+
+SAMPLE_BODY = {
+    "maskA": {
+        "rolle": "Vermieter",
+        "eigene_name": "Max Muster",
+        "eigene_anschrift": "Hauptstr. 1, 10115 Berlin",
+        "gegenpartei_name": "Erika Mieter",
+        "gegenpartei_anschrift": "Nebenweg 2, 10115 Berlin",
+        "objektadresse": "Hauptstr. 1, 10115 Berlin",
+        "wohnung_bez": "3-Zimmer-Wohnung",
+        "wohnflaeche": "75.5",
+        "grundmiete": "1000",
+        "vz_heizung": "80",
+        "vz_bk": "120",
+        "eigene_iban": "DE89370400440532013000",
+        "kaution": "3",
+        "mietbeginn": "2026-01-01",
+    },
+    "maskB": {
+        "vertragsart_final": "unbefristet",
+        "ro_mietbeginn": "2026-01-01",
+        "ro_grundmiete": "1000",
+        "kaution": "3",
+    },
+}
+
+
+def sample_body(rent: int = 1000) -> Dict[str, Any]:
+    """
+    SAMPLE_BODY with another rent: a different contract (no shared
+    render, no cached result).
+    """
+    return dict(SAMPLE_BODY, maskA=dict(SAMPLE_BODY["maskA"], grundmiete=str(rent)))
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import logging
+
+import azure.functions as func
+
+from src.shared.lifecycle import sweep_expired_contracts
+from src.shared.storage import configure_storage, get_storage_backend, get_storage_settings
+
+_logger = logging.getLogger(__name__)
+
+# Storage settings parsed once per worker
+configure_storage()
+
+
+def main(timer: func.TimerRequest) -> None:
+    # Daily at 03:15 UTC: delete contracts past CONTRACT_RETENTION_DAYS
+    if timer.past_due:
+        _logger.warning("Lifecycle sweep is running late")
+
+    settings = get_storage_settings()
+    report = sweep_expired_contracts(
+        get_storage_backend(),
+        retention_days=settings["retention_days"],
+        lookback_days=settings["sweep_lookback_days"],
+    )
+    for partition in report["partitions"]:
+        _logger.info(
+            "Deleted %d blob(s), %d bytes under %s",
+            partition["deleted"], partition["bytes"], partition["prefix"],
+        )
+    _logger.info(
+        "Deleted %d unpartitioned blob(s), %d bytes",
+        report["unpartitioned"]["deleted"], report["unpartitioned"]["bytes"],
+    )
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import logging
+import math
+
+import azure.functions as func
+
+from src.shared.contract_jobs import DONE, FAILED, PENDING, is_job_id, read_job_status
+from src.shared.errors import error_response, json_response
+from src.shared.storage import CircuitOpenError, configure_storage, get_download_url
+
+_logger = logging.getLogger(__name__)
+
+# Seconds a client should wait before polling a pending job again
+POLL_AFTER_SECONDS = 2
+
+# Storage settings parsed once per worker
+configure_storage()
+
+
+async def main(req: func.HttpRequest) -> func.HttpResponse:
+    job_id = req.params.get("id")
+    if not job_id:
+        return error_response("Missing query param: id", 400)
+    if not is_job_id(job_id):
+        return error_response("Invalid job id.", 400)
+
+    try:
+        record = await read_job_status(job_id)
+    except CircuitOpenError as exc:
+        return _unavailable(exc.retry_after)
+    except Exception:
+        # Not a 404: the job may well exist, ask the client to retry
+        _logger.exception("Could not read the status of contract job %s", job_id)
+        return _unavailable(POLL_AFTER_SECONDS)
+
+    if record is None:
+        return error_response("Job not found.", 404)
+
+    payload = {"ok": record["status"] != FAILED, **record}
+    headers = {"Cache-Control": "no-store"}
+    if record["status"] == DONE:
+        payload["downloadUrl"] = get_download_url(record["fileId"], req.url)
+    elif record["status"] == PENDING:
+        headers["Retry-After"] = str(POLL_AFTER_SECONDS)
+    return json_response(payload, headers=headers)
+
+
+def _unavailable(retry_after: float) -> func.HttpResponse:
+    response = error_response("Storage temporarily unavailable.", 503)
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
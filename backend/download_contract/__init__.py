@@ -1,30 +1,210 @@
 from __future__ import annotations
 
+import math
+import re
+from email.utils import format_datetime, parsedate_to_datetime
+
 import azure.functions as func
 
 from src.shared.errors import error_response
-from src.shared.storage import read_bytes_blob
+from src.shared.result_cache import RESULT_CACHE_CONTROL, is_known_result, is_result_blob, remember_result
+from src.shared.storage import (
+    DOCX_CONTENT_TYPE,
+    BlobConflictError,
+    CircuitOpenError,
+    configure_storage,
+    get_blob_info_async,
+    get_signed_blob_url,
+    is_blob_hot,
+    read_blob_range_async,
+)
+
+# Revalidate on every use (ETag / Last-Modified), never in shared caches
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Lookups + reads tried while the blob keeps changing in between
+_READ_ATTEMPTS = 2
+
+# Storage settings parsed once per worker
+configure_storage()
 
 
-def main(req: func.HttpRequest) -> func.HttpResponse:
+async def main(req: func.HttpRequest) -> func.HttpResponse:
     blob_name = req.params.get("id")
     if not blob_name:
         return error_response("Missing query param: id", 400)
 
+    # Direct-to-storage: hand out a signed URL instead of proxying bytes,
+    # unless this worker just generated it and still has it in memory
+    signed_url = None if is_blob_hot(blob_name) else get_signed_blob_url(blob_name)
+    if signed_url:
+        # Never redirect to a blob that is gone (expired, swept); a
+        # result this worker recently confirmed is not checked again
+        if not is_known_result(blob_name):
+            try:
+                await get_blob_info_async(blob_name)
+            except CircuitOpenError as exc:
+                return _unavailable(exc)
+            except Exception:
+                return error_response("File not found.", 404)
+            if is_result_blob(blob_name):
+                remember_result(blob_name)
+        return func.HttpResponse(
+            status_code=302,
+            headers={"Location": signed_url, "Cache-Control": "no-store"},
+        )
+
+    # The bytes are read with the ETag from the lookup: a blob replaced
+    # in between (fallback copy uploaded, spool flushed) is looked up
+    # again instead of mixing the headers of one version with the body
+    # of another
+    for _ in range(_READ_ATTEMPTS):
+        try:
+            return await _serve(req, blob_name)
+        except BlobConflictError:
+            continue
+    response = error_response("File is being updated, please retry.", 503)
+    response.headers["Retry-After"] = "1"
+    return response
+
+
+async def _serve(req: func.HttpRequest, blob_name: str) -> func.HttpResponse:
     try:
-        data = read_bytes_blob(blob_name)
+        info = await get_blob_info_async(blob_name)
+    except CircuitOpenError as exc:
+        return _unavailable(exc)
     except Exception:
         return error_response("File not found.", 404)
 
+    size = info["size"]
+    etag = info["etag"]
+
     headers = {
-        "Content-Disposition": f'attachment; filename="{blob_name}"',
-        "Content-Length": str(len(data)),
-        "Cache-Control": "no-store",
+        "ETag": etag,
+        "Last-Modified": format_datetime(info["last_modified"], usegmt=True),
+        "Accept-Ranges": "bytes",
+        # Content-addressed results never change
+        "Cache-Control": RESULT_CACHE_CONTROL if is_result_blob(blob_name) else REVALIDATE_CACHE_CONTROL,
     }
 
+    # ====================================================
+    # Conditional GET / HEAD
+    # ====================================================
+    if _not_modified(req, etag, info["last_modified"]):
+        return func.HttpResponse(status_code=304, headers=headers)
+
+    headers["Content-Disposition"] = f'attachment; filename="{blob_name}"'
+
+    # ====================================================
+    # Single-range requests
+    # ====================================================
+    byte_range = None
+    range_header = req.headers.get("Range")
+    if range_header and _if_range_matches(req, etag, headers["Last-Modified"]):
+        byte_range = _parse_range(range_header, size)
+        if byte_range == "unsatisfiable":
+            headers["Content-Range"] = f"bytes */{size}"
+            return func.HttpResponse(status_code=416, headers=headers)
+
+    if byte_range is None:
+        status_code, offset, length = 200, 0, size
+    else:
+        start, end = byte_range
+        status_code, offset, length = 206, start, end - start + 1
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    headers["Content-Length"] = str(length)
+
+    if req.method.upper() == "HEAD":
+        return func.HttpResponse(status_code=status_code, headers=headers, mimetype=DOCX_CONTENT_TYPE)
+
+    try:
+        data = await read_blob_range_async(blob_name, offset, length if byte_range else None, etag)
+    except BlobConflictError:
+        raise
+    except CircuitOpenError as exc:
+        return _unavailable(exc)
+    except Exception:
+        return error_response("File not found.", 404)
+
     return func.HttpResponse(
         body=data,
-        status_code=200,
+        status_code=status_code,
         headers=headers,
-        mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        mimetype=DOCX_CONTENT_TYPE,
     )
+
+
+# ============================================================
+# Helpers
+# ============================================================
+
+def _unavailable(exc: CircuitOpenError) -> func.HttpResponse:
+    # Storage is being skipped (circuit open): retry once it is probed again
+    response = error_response("Storage temporarily unavailable.", 503)
+    response.headers["Retry-After"] = str(max(1, math.ceil(exc.retry_after)))
+    return response
+
+
+def _not_modified(req: func.HttpRequest, etag: str, last_modified) -> bool:
+    if_none_match = req.headers.get("If-None-Match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = req.headers.get("If-Modified-Since")
+    if if_modified_since:
+        try:
+            return last_modified.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # Weak comparison (RFC 9110 §13.1.2)
+    if header.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == bare for candidate in header.split(","))
+
+
+def _if_range_matches(req: func.HttpRequest, etag: str, last_modified_http: str) -> bool:
+    if_range = req.headers.get("If-Range")
+    if not if_range:
+        return True
+    # Strong comparison for ETags, exact match for dates
+    return if_range.strip() in (etag, last_modified_http)
+
+
+def _parse_range(header: str, size: int):
+    """
+    Parse a single `bytes=` range. Returns (start, end) inclusive,
+    None to ignore the header (malformed / multi-range: full response)
+    or "unsatisfiable".
+    """
+    match = _RANGE_RE.match(header.strip())
+    if match is None:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if size == 0:
+        return "unsatisfiable"
+
+    if not first:
+        # Suffix range: last N bytes
+        suffix = int(last)
+        if suffix == 0:
+            return "unsatisfiable"
+        return max(0, size - suffix), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if end < start:
+        return None
+    if start >= size:
+        return "unsatisfiable"
+    return start, min(end, size - 1)
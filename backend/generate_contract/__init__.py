@@ -1,54 +1,105 @@
 from __future__ import annotations
 
+import math
+
 import azure.functions as func
 
+from src.shared.admission import AdmissionRejected
+from src.shared.contract_service import (
+    find_cached_result,
+    forget_cached_result,
+    prepare_contract,
+    render_and_store_contract,
+    render_contract,
+    store_contract_in_background,
+    warm_contract_service,
+)
 from src.shared.errors import json_response, error_response
-from src.shared.normalize import normalize_mask_a, normalize_mask_b, apply_defaults
-from src.shared.validate import validate_core
-from src.shared.mapping import build_render_context
-from src.shared.generator_docx import generate_docx_from_template
-from src.shared.storage import save_bytes_blob, get_download_url
+from src.shared.storage import DOCX_CONTENT_TYPE, get_download_url, read_bytes_blob_async
 
-TEMPLATE_ALLOWLIST = {
-    "base_contract.docx": "templates/base_contract.docx",
-}
+warm_contract_service()
 
 
-def main(req: func.HttpRequest) -> func.HttpResponse:
+async def main(req: func.HttpRequest) -> func.HttpResponse:
     try:
         body = req.get_json()
     except Exception:
         return error_response("Invalid JSON body.", 400)
 
-    if not isinstance(body, dict):
-        return error_response("Body must be a JSON object.", 400)
+    job, error = prepare_contract(body)
+    if error:
+        return error_response(error["message"], error["status"], details=error["details"])
+
+    inline = _wants_inline(req)
+    file_id = job["fileId"]
 
-    mask_a = normalize_mask_a(body.get("maskA") or {})
-    mask_b = normalize_mask_b(body.get("maskB") or {})
+    # Content-addressed result: same input → same blob, rendered once
+    if await find_cached_result(job):
+        if not inline:
+            return _file_response(req, file_id, cached=True)
+        try:
+            return _inline_response(await read_bytes_blob_async(file_id), file_id, cached=True)
+        except Exception:
+            forget_cached_result(job)  # gone meanwhile: render again
+
+    # Identical requests in flight (double-clicks, retries) share one
+    # render and upload
+    try:
+        if not inline:
+            file_id = await render_and_store_contract(job)
+            return _file_response(req, file_id, cached=False)
+        docx_bytes = await render_contract(job)
+    except AdmissionRejected as exc:
+        return _overloaded(exc)
 
-    mask_a, mask_b = apply_defaults(mask_a, mask_b)
+    # Bytes go straight back; only a content-addressed result is worth
+    # storing (for later regenerations), after the response
+    store_contract_in_background(job, docx_bytes)
+    return _inline_response(docx_bytes, file_id, cached=False)
+
+
+def _overloaded(exc: AdmissionRejected) -> func.HttpResponse:
+    # Render queue full: shed the request now instead of slowing all down
+    response = error_response(
+        "Too many contracts are being generated, please retry.",
+        429,
+        details={"reason": exc.reason, "queued": exc.queued},
+    )
+    response.headers["Retry-After"] = str(max(1, math.ceil(exc.retry_after)))
+    return response
 
-    ok, errors = validate_core(mask_a, mask_b)
-    if not ok:
-        return error_response("Validation failed.", 422, details={"errors": errors})
 
-    ctx = build_render_context(mask_a, mask_b)
+def _wants_inline(req: func.HttpRequest) -> bool:
+    # ?inline=true, or a client that asks for the document itself
+    if req.params.get("inline", "").strip().lower() in ("1", "true", "yes"):
+        return True
+    return DOCX_CONTENT_TYPE in (req.headers.get("Accept") or "")
 
-    template_path = body.get("templatePath") or "base_contract.docx"
-    if template_path not in TEMPLATE_ALLOWLIST:
-        return error_response("Invalid templatePath.", 400)
 
-    docx_bytes = generate_docx_from_template(
-        template_path=TEMPLATE_ALLOWLIST[template_path],
-        ctx=ctx,
+def _inline_response(docx_bytes: bytes, file_id: str | None, cached: bool) -> func.HttpResponse:
+    headers = {
+        "Content-Disposition": f'attachment; filename="{file_id or "contract.docx"}"',
+        "Cache-Control": "no-store",
+        "Vary": "Accept",
+        "X-Result-Cached": "true" if cached else "false",
+        "Access-Control-Expose-Headers": "Content-Disposition, X-File-Id, X-Result-Cached",
+    }
+    if file_id is not None:
+        headers["X-File-Id"] = file_id
+    return func.HttpResponse(
+        body=docx_bytes,
+        status_code=200,
+        headers=headers,
+        mimetype=DOCX_CONTENT_TYPE,
     )
 
-    file_id = save_bytes_blob(docx_bytes, suffix=".docx")
 
+def _file_response(req: func.HttpRequest, file_id: str, cached: bool) -> func.HttpResponse:
     return json_response(
         {
             "ok": True,
             "downloadUrl": get_download_url(file_id, req.url),
             "fileId": file_id,
+            "cached": cached,
         }
     )
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import logging
+import math
+import zipfile
+from typing import Any, Dict, List
+
+import azure.functions as func
+
+from src.shared.admission import AdmissionRejected
+from src.shared.contract_service import (
+    DEFAULT_TEMPLATE,
+    find_cached_result,
+    forget_cached_result,
+    prepare_contract,
+    render_contract,
+    store_contract,
+    store_contract_in_background,
+    warm_contract_service,
+)
+from src.shared.errors import error_response, json_response
+from src.shared.settings import int_setting
+from src.shared.storage import get_download_url, read_bytes_blob_async
+
+_logger = logging.getLogger(__name__)
+
+# ============================================================
+# Batch generation (whole buildings / portfolios)
+# ============================================================
+#
+# POST {"items": [{"maskA", "maskB", "templatePath"?}, ...],
+#       "templatePath"?: default for the items,
+#       "output"?: "manifest" (default) | "zip"}
+#
+# Every item is validated before anything is rendered (422 with the
+# errors per item index). Items are then rendered concurrently against
+# the compiled template; identical items are rendered once.
+#
+#   manifest: contracts are stored, the response lists
+#             {"index", "ok", "fileId", "downloadUrl", "cached"} per item
+#   zip:      one ZIP archive with every contract (also with
+#             `Accept: application/zip`); nothing is stored unless the
+#             result cache is on (stored after the response)
+#
+# Settings:
+#   BATCH_MAX_ITEMS            default 200
+#   BATCH_RENDER_CONCURRENCY   renders in flight per request (default 8)
+
+ZIP_CONTENT_TYPE = "application/zip"
+
+
+BATCH_MAX_ITEMS = int_setting("BATCH_MAX_ITEMS", 200, minimum=1)
+BATCH_RENDER_CONCURRENCY = int_setting("BATCH_RENDER_CONCURRENCY", 8, minimum=1)
+
+warm_contract_service()
+
+
+async def main(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        body = req.get_json()
+    except Exception:
+        return error_response("Invalid JSON body.", 400)
+
+    if not isinstance(body, dict):
+        return error_response("Body must be a JSON object.", 400)
+
+    items = body.get("items")
+    if not isinstance(items, list) or not items:
+        return error_response("Body must contain a non-empty 'items' list.", 400)
+    if len(items) > BATCH_MAX_ITEMS:
+        return error_response(f"At most {BATCH_MAX_ITEMS} items per batch.", 413)
+
+    output = (body.get("output") or "").strip().lower()
+    if not output:
+        output = "zip" if ZIP_CONTENT_TYPE in (req.headers.get("Accept") or "") else "manifest"
+    if output not in ("manifest", "zip"):
+        return error_response("Invalid output (manifest|zip).", 400)
+
+    # ====================================================
+    # Validate everything up front
+    # ====================================================
+    default_template = body.get("templatePath") or DEFAULT_TEMPLATE
+    jobs: List[Dict[str, Any]] = []
+    item_errors: List[Dict[str, Any]] = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            item_errors.append({"index": index, "error": "Item must be a JSON object."})
+            continue
+        job, error = prepare_contract(item, default_template)
+        if error:
+            item_errors.append({"index": index, "error": error["message"], **(error["details"] or {})})
+        else:
+            jobs.append(job)
+
+    if item_errors:
+        return error_response("Validation failed.", 422, details={"items": item_errors})
+
+    # ====================================================
+    # Render (identical items once)
+    # ====================================================
+    semaphore = asyncio.Semaphore(BATCH_RENDER_CONCURRENCY)
+    unique: Dict[str, asyncio.Task] = {}
+    tasks = []
+    for job in jobs:
+        if job["fileId"] is None:
+            tasks.append(asyncio.ensure_future(_process(job, output, semaphore)))
+            continue
+        if job["fileId"] not in unique:
+            unique[job["fileId"]] = asyncio.ensure_future(_process(job, output, semaphore))
+        tasks.append(unique[job["fileId"]])
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    # The worker's render backlog is full: retry the whole batch later
+    rejected = [result for result in results if isinstance(result, AdmissionRejected)]
+    if rejected:
+        return _overloaded(rejected[0])
+
+    if output == "zip":
+        return _zip_response(results)
+    return _manifest_response(req, results)
+
+
+async def _process(job: Dict[str, Any], output: str, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+    async with semaphore:
+        if await find_cached_result(job):
+            if output != "zip":
+                return {"fileId": job["fileId"], "cached": True, "data": None}
+            try:
+                data = await read_bytes_blob_async(job["fileId"])
+                return {"fileId": job["fileId"], "cached": True, "data": data}
+            except Exception:
+                forget_cached_result(job)  # gone meanwhile: render again
+
+        # Waits for a render slot rather than failing part of the batch
+        # (up to the worker's backlog limit)
+        docx_bytes = await render_contract(job, wait=True)
+
+    if output == "zip":
+        store_contract_in_background(job, docx_bytes)
+        return {"fileId": job["fileId"], "cached": False, "data": docx_bytes}
+
+    file_id = await store_contract(job, docx_bytes)
+    return {"fileId": file_id, "cached": False, "data": None}
+
+
+def _overloaded(exc: AdmissionRejected) -> func.HttpResponse:
+    response = error_response(
+        "Too many contracts are being generated, please retry.",
+        429,
+        details={"reason": exc.reason, "queued": exc.queued},
+    )
+    response.headers["Retry-After"] = str(max(1, math.ceil(exc.retry_after)))
+    return response
+
+
+def _manifest_response(req: func.HttpRequest, results: list) -> func.HttpResponse:
+    manifest = []
+    for index, result in enumerate(results):
+        if isinstance(result, BaseException):
+            _logger.error("Batch item %d failed: %r", index, result)
+            manifest.append({"index": index, "ok": False, "error": "Rendering failed."})
+            continue
+        manifest.append(
+            {
+                "index": index,
+                "ok": True,
+                "fileId": result["fileId"],
+                "downloadUrl": get_download_url(result["fileId"], req.url),
+                "cached": result["cached"],
+            }
+        )
+    return json_response({"ok": all(item["ok"] for item in manifest), "items": manifest})
+
+
+def _zip_response(results: list) -> func.HttpResponse:
+    failed = [index for index, result in enumerate(results) if isinstance(result, BaseException)]
+    if failed:
+        for index in failed:
+            _logger.error("Batch item %d failed: %r", index, results[index])
+        return error_response("Rendering failed.", 500, details={"items": failed})
+
+    # DOCX files are already deflated: store them as they are
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        for index, result in enumerate(results):
+            name = result["fileId"] or "contract.docx"
+            archive.writestr(f"{index + 1:04d}-{name}", result["data"])
+
+    return func.HttpResponse(
+        body=buffer.getvalue(),
+        status_code=200,
+        headers={
+            "Content-Disposition": 'attachment; filename="contracts.zip"',
+            "Cache-Control": "no-store",
+        },
+        mimetype=ZIP_CONTENT_TYPE,
+    )
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import math
+
+import azure.functions as func
+
+from src.shared.contract_jobs import DONE, job_status_url, submit_job
+from src.shared.contract_service import prepare_contract, warm_contract_service
+from src.shared.errors import error_response, json_response
+from src.shared.storage import CircuitOpenError, get_download_url
+
+warm_contract_service()
+
+
+async def main(req: func.HttpRequest, jobQueue: func.Out[str]) -> func.HttpResponse:
+    try:
+        body = req.get_json()
+    except Exception:
+        return error_response("Invalid JSON body.", 400)
+
+    job, error = prepare_contract(body)
+    if error:
+        return error_response(error["message"], error["status"], details=error["details"])
+
+    try:
+        record = await submit_job(job, jobQueue)
+    except CircuitOpenError as exc:
+        response = error_response("Storage temporarily unavailable.", 503)
+        response.headers["Retry-After"] = str(max(1, math.ceil(exc.retry_after)))
+        return response
+
+    # Rendered by process_contract_job; poll statusUrl
+    status_url = job_status_url(record["jobId"], req.url)
+    payload = {"ok": True, "jobId": record["jobId"], "status": record["status"], "statusUrl": status_url}
+    if record["status"] == DONE:
+        payload["fileId"] = record["fileId"]
+        payload["downloadUrl"] = get_download_url(record["fileId"], req.url)
+    return json_response(payload, 202, headers={"Location": status_url})
@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+import azure.functions as func
+
+from src.shared.contract_jobs import process_job_message
+from src.shared.contract_service import warm_contract_service
+
+warm_contract_service()
+
+
+async def main(msg: func.QueueMessage) -> None:
+    # Raising leaves the message on the queue for another attempt
+    # (host.json queues.maxDequeueCount); the last one records "failed"
+    await process_job_message(msg.get_body().decode("utf-8"), msg.dequeue_count or 1)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import json
 from pathlib import Path
 from datetime import datetime
@@ -11,17 +12,22 @@ from src.shared.errors import json_response, error_response
 from src.shared.normalize import normalize_mask_a
 
 
-def main(req: func.HttpRequest) -> func.HttpResponse:
+async def main(req: func.HttpRequest) -> func.HttpResponse:
     try:
         body = req.get_json()
     except Exception:
         return error_response("Invalid JSON body.", 400)
 
     mask_a = normalize_mask_a(body if isinstance(body, dict) else {})
-    out_dir = Path(".local_out") / "maskA"
-    out_dir.mkdir(parents=True, exist_ok=True)
-
     file_id = f"maskA_{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}_{uuid.uuid4().hex}.json"
-    (out_dir / file_id).write_text(json.dumps(mask_a, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    # File I/O off the event loop
+    await asyncio.to_thread(_write_mask_a, file_id, mask_a)
 
     return json_response({"ok": True, "id": file_id})
+
+
+def _write_mask_a(file_id: str, mask_a: dict) -> None:
+    out_dir = Path(".local_out") / "maskA"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / file_id).write_text(json.dumps(mask_a, ensure_ascii=False, indent=2), encoding="utf-8")
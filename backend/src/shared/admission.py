@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from src.shared.render_pool import resolve_pool_size
+from src.shared.settings import float_setting, int_setting
+
+_logger = logging.getLogger(__name__)
+
+# ============================================================
+# Render admission control
+# ============================================================
+#
+# At most `limit` renders run at once per worker; up to `max_queue`
+# more wait (in arrival order) for at most `max_wait` seconds. A request
+# that finds the queue full, or waits too long, is rejected at once
+# (AdmissionRejected → 429 + Retry-After) instead of slowing down every
+# request in flight: latency stays bounded under bursts, and so does
+# the memory held by documents being rendered.
+#
+# Work that has no one to answer quickly (batch items, queued jobs)
+# waits for a slot instead (`wait=True`), without a time limit; it
+# still counts in the queue depth, so it pushes interactive requests to
+# 429 first. It is bounded by `max_backlog` waiters in all: beyond that
+# it is rejected too (the batch answers 429, the queued job is retried).
+#
+# stats() is logged every `log_interval` seconds while renders run.
+#
+# Settings:
+#   DOCX_RENDER_CONCURRENCY     renders at once (default: render pool
+#                               size, 4 when rendering in threads)
+#   DOCX_RENDER_QUEUE           requests waiting for a slot
+#                               (default 2 x concurrency)
+#   DOCX_RENDER_QUEUE_TIMEOUT   seconds a request may wait (default 5)
+#   DOCX_RENDER_BACKLOG         waiters in all, batch items and jobs
+#                               included (default 8 x concurrency)
+#   DOCX_RENDER_STATS_INTERVAL  seconds between stats log lines
+#                               (default 60, 0 = off)
+
+# Wait times kept for the percentiles in stats()
+_WAIT_SAMPLES = 1024
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float, queued: int):
+        super().__init__(f"Render admission rejected ({reason}), retry after {retry_after:.0f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+        self.queued = queued
+
+
+class RenderAdmission:
+    """
+    Bounded concurrency + bounded wait queue for one event loop.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        max_queue: int,
+        max_wait: float,
+        max_backlog: Optional[int] = None,
+        log_interval: float = 0.0,
+    ):
+        self.limit = max(1, limit)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self.max_backlog = max(self.max_queue, max_backlog if max_backlog is not None else 8 * self.limit)
+        self.log_interval = log_interval
+        self._next_log = time.monotonic() + log_interval
+
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Counters are read from other threads (stats)
+        self._lock = threading.Lock()
+        self._waits: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self._render_avg = 0.0
+        self._counters = {"admitted": 0, "rejected": 0, "timed_out": 0, "max_queued": 0}
+
+    @contextlib.asynccontextmanager
+    async def slot(self, wait: bool = False) -> AsyncIterator[float]:
+        """
+        Hold a render slot; yields the seconds spent waiting for it.
+        Raises AdmissionRejected (unless `wait`).
+        """
+        waited = await self._acquire(wait)
+        start_time = time.monotonic()
+        try:
+            yield waited
+        finally:
+            self._release()
+            elapsed = time.monotonic() - start_time
+            with self._lock:
+                # Moving average of the render time, for Retry-After
+                self._render_avg = elapsed if not self._render_avg else 0.8 * self._render_avg + 0.2 * elapsed
+            self._maybe_log_stats()
+
+    def retry_after(self) -> float:
+        """
+        Rough time until a slot frees up for a new request.
+        """
+        with self._lock:
+            render_avg = self._render_avg or 1.0
+        backlog = len(self._waiters) + self._in_flight
+        return max(1.0, math.ceil(render_avg * backlog / self.limit))
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            waits = sorted(self._waits)
+            counters = dict(self._counters)
+            render_avg = self._render_avg
+        return {
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "max_backlog": self.max_backlog,
+            "in_flight": self._in_flight,
+            "queued": len(self._waiters),
+            **counters,
+            "wait_p50_ms": _percentile_ms(waits, 0.50),
+            "wait_p99_ms": _percentile_ms(waits, 0.99),
+            "wait_max_ms": round(waits[-1] * 1000, 1) if waits else 0.0,
+            "render_avg_ms": round(render_avg * 1000, 1),
+        }
+
+    # ====================================================
+    # Slots
+    # ====================================================
+    async def _acquire(self, wait: bool) -> float:
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            self._record_wait(0.0)
+            return 0.0
+
+        if not wait and len(self._waiters) >= self.max_queue:
+            self._reject("queue full", "rejected")
+        if wait and len(self._waiters) >= self.max_backlog:
+            self._reject("backlog full", "rejected")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        with self._lock:
+            self._counters["max_queued"] = max(self._counters["max_queued"], len(self._waiters))
+        start_time = time.monotonic()
+        try:
+            # A released slot is handed over to the waiter (see _release)
+            await asyncio.wait_for(waiter, None if wait else self.max_wait)
+        except asyncio.TimeoutError:
+            # Unless the slot was handed over just as the wait expired
+            if not waiter.done() or waiter.cancelled():
+                self._reject("wait timeout", "timed_out")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+        waited = time.monotonic() - start_time
+        self._record_wait(waited)
+        return waited
+
+    def _release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def _record_wait(self, waited: float) -> None:
+        with self._lock:
+            self._counters["admitted"] += 1
+            self._waits.append(waited)
+
+    def _reject(self, reason: str, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+        retry_after = self.retry_after()
+        _logger.info(
+            "Render rejected (%s): %d in flight, %d queued, retry after %.0fs",
+            reason, self._in_flight, len(self._waiters), retry_after,
+        )
+        raise AdmissionRejected(reason, retry_after, len(self._waiters))
+
+    def _maybe_log_stats(self) -> None:
+        if not self.log_interval:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_log:
+                return
+            self._next_log = now + self.log_interval
+        _logger.info("Render admission: %s", self.stats())
+
+
+def _percentile_ms(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return round(sorted_values[index] * 1000, 1)
+
+
+# ============================================================
+# Worker-wide instance
+# ============================================================
+
+_render_admission: Optional[RenderAdmission] = None
+_admission_lock = threading.Lock()
+
+
+def get_render_admission() -> RenderAdmission:
+    global _render_admission
+    with _admission_lock:
+        if _render_admission is None:
+            limit = int_setting("DOCX_RENDER_CONCURRENCY", resolve_pool_size() or 4, minimum=1)
+            _render_admission = RenderAdmission(
+                limit=limit,
+                max_queue=int_setting("DOCX_RENDER_QUEUE", 2 * limit, minimum=0),
+                max_wait=float_setting("DOCX_RENDER_QUEUE_TIMEOUT", 5.0, minimum=0.0),
+                max_backlog=int_setting("DOCX_RENDER_BACKLOG", 8 * limit, minimum=0),
+                log_interval=float_setting("DOCX_RENDER_STATS_INTERVAL", 60.0, minimum=0.0),
+            )
+        return _render_admission
+
+
+def get_render_admission_stats() -> Dict[str, object]:
+    """
+    {"limit", "max_queue", "max_backlog", "in_flight", "queued",
+    "admitted", "rejected", "timed_out", "max_queued", "wait_p50_ms",
+    "wait_p99_ms", "wait_max_ms", "render_avg_ms"}.
+    """
+    return get_render_admission().stats()
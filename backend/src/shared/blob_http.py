@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict
+
+import aiohttp
+import requests
+from azure.core.pipeline.transport import AioHttpTransport, RequestsTransport
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+# ============================================================
+# HTTP transports for the blob clients (pooled, instrumented)
+# ============================================================
+#
+# The Azure SDK's default transports keep only a handful of idle
+# connections per host (requests: 10), so under concurrency most blob
+# calls open a new TCP + TLS connection. These transports own a pool
+# sized from the settings and count what the pool does:
+#
+#   created : new connections opened (each one a TCP + TLS handshake)
+#   reused  : requests sent on an already open connection
+#   in_use  : connections currently checked out (async: requests
+#             in flight up to their response headers)
+#
+# Settings (parsed in storage_backends.load_storage_settings):
+#   AZURE_STORAGE_POOL_SIZE         connections kept per host (default 32)
+#   AZURE_STORAGE_KEEPALIVE_SECONDS idle time before an async connection
+#                                   is closed (default 60, 0 = no keep-alive)
+#   AZURE_STORAGE_CONNECT_TIMEOUT   seconds (default 10)
+#   AZURE_STORAGE_READ_TIMEOUT      seconds (default 30)
+
+_stats: Dict[str, Dict[str, int]] = {
+    "sync": {"created": 0, "reused": 0, "in_use": 0},
+    "async": {"created": 0, "reused": 0, "in_use": 0},
+}
+_stats_lock = threading.Lock()
+
+
+def _count(transport: str, key: str, delta: int = 1) -> None:
+    with _stats_lock:
+        _stats[transport][key] += delta
+
+
+def get_pool_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Snapshot of the connection counters, per transport ("sync", "async").
+    """
+    with _stats_lock:
+        return {transport: dict(counters) for transport, counters in _stats.items()}
+
+
+def reset_pool_stats() -> None:
+    # in_use tracks live connections: only the totals start over
+    with _stats_lock:
+        for counters in _stats.values():
+            counters["created"] = 0
+            counters["reused"] = 0
+
+
+# ============================================================
+# Sync transport (requests / urllib3)
+# ============================================================
+
+class _CountingHTTPConnection(HTTPConnection):
+    def connect(self):
+        super().connect()
+        _count("sync", "created")
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        super().connect()
+        _count("sync", "created")
+
+
+class _CountingPoolMixin:
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        _count("sync", "in_use")
+        # A connection with an open socket skips the handshake
+        if getattr(conn, "sock", None) is not None:
+            _count("sync", "reused")
+        return conn
+
+    def _put_conn(self, conn):
+        _count("sync", "in_use", -1)
+        super()._put_conn(conn)
+
+
+class _CountingHTTPConnectionPool(_CountingPoolMixin, HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(_CountingPoolMixin, HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class _CountingHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        # Larger socket writes for uploads (as the SDK's own adapter)
+        pool_kwargs.setdefault("blocksize", 32768)
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+class _NoHostsRequestsTransport(RequestsTransport):
+    def send(self, request, **kwargs):
+        kwargs.pop("hosts", None)
+        kwargs.pop("location_mode", None)
+        return super().send(request, **kwargs)
+
+
+def build_sync_transport(settings: Dict[str, object]) -> RequestsTransport:
+    """
+    requests transport over one session with a pool of
+    `http_pool_size` connections per host.
+    """
+    session = requests.Session()
+    session.trust_env = True
+    # Retries are the pipeline's RetryPolicy, not urllib3's.
+    # Only blob hosts: a few pools, each holding `http_pool_size` connections.
+    adapter = _CountingHTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=settings["http_pool_size"],
+        max_retries=Retry(total=False, redirect=False, raise_on_status=False),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if settings["http_keepalive"] <= 0:
+        session.headers["Connection"] = "close"
+
+    return _NoHostsRequestsTransport(
+        session=session,
+        # Closing the client closes the session (and its pool)
+        session_owner=True,
+        connection_timeout=settings["http_connect_timeout"],
+        read_timeout=settings["http_read_timeout"],
+    )
+
+
+# ============================================================
+# Async transport (aiohttp)
+# ============================================================
+
+class _NoHostsAioHttpTransport(AioHttpTransport):
+    async def send(self, request, **kwargs):
+        kwargs.pop("hosts", None)
+        kwargs.pop("location_mode", None)
+        return await super().send(request, **kwargs)
+
+
+def build_async_transport(settings: Dict[str, object]) -> AioHttpTransport:
+    """
+    aiohttp transport with up to `http_pool_size` connections per host.
+    Must be called on the event loop the client will run on.
+    """
+    keepalive = settings["http_keepalive"]
+    connector = aiohttp.TCPConnector(
+        limit=0,
+        limit_per_host=settings["http_pool_size"],
+        keepalive_timeout=keepalive if keepalive > 0 else None,
+        force_close=keepalive <= 0,
+    )
+    session = aiohttp.ClientSession(
+        connector=connector,
+        trace_configs=[_async_trace_config()],
+        # Same session options the SDK uses for the sessions it owns
+        cookie_jar=aiohttp.DummyCookieJar(),
+        auto_decompress=False,
+        trust_env=True,
+    )
+    return _NoHostsAioHttpTransport(
+        session=session,
+        # Closing the client closes the session (and its pool)
+        session_owner=True,
+        connection_timeout=settings["http_connect_timeout"],
+        read_timeout=settings["http_read_timeout"],
+    )
+
+
+def _async_trace_config() -> aiohttp.TraceConfig:
+    trace = aiohttp.TraceConfig()
+
+    async def on_create(session, context, params):
+        _count("async", "created")
+
+    async def on_reuse(session, context, params):
+        _count("async", "reused")
+
+    async def on_request_start(session, context, params):
+        _count("async", "in_use")
+
+    async def on_request_done(session, context, params):
+        _count("async", "in_use", -1)
+
+    trace.on_connection_create_end.append(on_create)
+    trace.on_connection_reuseconn.append(on_reuse)
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_done)
+    trace.on_request_exception.append(on_request_done)
+    return trace
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import re
+import uuid
+from datetime import date, datetime, timezone
+from typing import Optional
+
+# ============================================================
+# Date-partitioned blob names
+# ============================================================
+#
+# Contract blobs are named <YYYYMMDD>-<id><suffix> (UTC creation day),
+# so everything created on one day shares a name prefix. The lifecycle
+# sweeper (lifecycle.py) lists and deletes whole expired days by prefix
+# and never lists the rest of the container; the local store keeps one
+# directory per day.
+#
+# Names without a partition (stored by older versions) stay readable.
+
+_PARTITION_FORMAT = "%Y%m%d"
+_PARTITION_RE = re.compile(r"^(\d{8})-")
+
+
+def utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def partition_prefix(day: date) -> str:
+    """
+    Name prefix shared by every blob created on `day`.
+    """
+    return f"{day.strftime(_PARTITION_FORMAT)}-"
+
+
+def partitioned_name(name: str, day: Optional[date] = None) -> str:
+    return f"{partition_prefix(day or utc_today())}{name}"
+
+
+def new_blob_name(suffix: str = ".docx") -> str:
+    """
+    Random blob name in today's partition.
+    """
+    return partitioned_name(f"{uuid.uuid4().hex}{suffix}")
+
+
+def blob_partition(blob_name: str) -> Optional[str]:
+    """
+    The YYYYMMDD partition of a blob name, None for unpartitioned names.
+    """
+    match = _PARTITION_RE.match(blob_name or "")
+    return match.group(1) if match else None
+
+
+def strip_partition(blob_name: str) -> str:
+    partition = blob_partition(blob_name)
+    return blob_name[len(partition) + 1:] if partition else blob_name
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import logging
+import threading
+from time import monotonic
+from typing import Dict, Optional
+
+_logger = logging.getLogger(__name__)
+
+# ============================================================
+# Circuit breaker
+# ============================================================
+#
+#   closed    : calls go through; `failure_threshold` consecutive
+#               failures open the circuit
+#   open      : calls are refused (callers take their fallback) for
+#               `reset_timeout` seconds
+#   half_open : ONE probe call goes through; success closes the
+#               circuit, failure opens it for another `reset_timeout`
+#
+# State changes are logged; stats() returns the counters.
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a call is refused and no fallback can answer it.
+    `retry_after` = seconds until the next probe.
+    """
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} unavailable (circuit open)")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = max(0.0, reset_timeout)
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self._counters = {"opened": 0, "rejected": 0, "probes": 0}
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        """
+        True if the call may go to the service, False to take the fallback.
+        """
+        if self._state == CLOSED:
+            return True
+
+        now = monotonic()
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+                self._set_state(HALF_OPEN)
+            # One probe at a time; a probe that never reported back
+            # (unexpected exception) is replaced after reset_timeout
+            if self._state == HALF_OPEN and (
+                self._probe_started is None or now - self._probe_started >= self.reset_timeout
+            ):
+                self._probe_started = now
+                self._counters["probes"] += 1
+                return True
+            self._counters["rejected"] += 1
+            return False
+
+    def retry_after(self) -> float:
+        """
+        Seconds until the next probe may run (0 when closed).
+        """
+        if self._state == CLOSED:
+            return 0.0
+        return max(0.0, self.reset_timeout - (monotonic() - self._opened_at))
+
+    def record_success(self) -> None:
+        if self._state == CLOSED and self._failures == 0:
+            return
+        with self._lock:
+            self._failures = 0
+            self._probe_started = None
+            if self._state != CLOSED:
+                self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_started = None
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._opened_at = monotonic()
+                self._counters["opened"] += 1
+                self._set_state(OPEN)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "retry_after": round(self.retry_after(), 1),
+                **self._counters,
+            }
+
+    def _set_state(self, state: str) -> None:
+        # Caller holds self._lock
+        previous, self._state = self._state, state
+        if state == OPEN:
+            _logger.warning(
+                "Circuit %s %s -> open after %d failure(s), next probe in %.0fs",
+                self.name, previous, self._failures, self.reset_timeout,
+            )
+        else:
+            _logger.info("Circuit %s %s -> %s", self.name, previous, state)
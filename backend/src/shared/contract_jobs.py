@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.shared.blob_names import new_blob_name
+from src.shared.contract_service import find_cached_result, render_contract, store_contract
+from src.shared.settings import int_setting
+from src.shared.storage import BlobConflictError, read_record_async, write_record_async
+
+_logger = logging.getLogger(__name__)
+
+# ============================================================
+# Asynchronous generation jobs (queue + status records)
+# ============================================================
+#
+#   generate_contract_job  validate, record "pending", enqueue → 202
+#   process_contract_job   (queue trigger) render + store, record
+#                          "done" (fileId) or "failed"
+#   contract_job_status    report the record
+#
+# The HTTP request never waits for a render or an upload.
+#
+# Job ids are <YYYYMMDD>-<hex> (blob_names.py) and the status record is
+# the blob <jobId>.job.json, so the lifecycle sweeper expires it with
+# the contracts of the same day. Records change and every instance
+# reads them, so they are written straight to the primary store (no
+# hot cache, spool or local fallback, see storage.py "Records") and
+# only ever move forward: "pending" is created once, "done" / "failed"
+# replace the pending version that was read (ETag condition). A
+# duplicate delivery that finds the record already changed leaves it.
+#
+# Settings:
+#   CONTRACT_JOB_QUEUE          azure (queue binding) | local
+#                               (default: azure when AzureWebJobsStorage
+#                               is set, else local)
+#   CONTRACT_JOB_MAX_ATTEMPTS   renders tried before a job fails
+#                               (default 5, keep it equal to
+#                               queues.maxDequeueCount in host.json)
+#   CONTRACT_JOB_LOCAL_WORKERS  jobs rendered at once by the local
+#                               queue (default 2)
+#
+# The local queue is an in-process stand-in for offline runs: jobs run
+# on the worker's event loop and are retried like queue messages, but
+# they are lost when the process exits.
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+_JOB_ID_RE = re.compile(r"^\d{8}-[0-9a-f]{32}$")
+_STATUS_SUFFIX = ".job.json"
+_RETRY_MAX_DELAY = 30.0
+
+# Local queue, bound to the event loop that created it
+_local_queue: Optional[asyncio.Queue] = None
+_local_loop: Optional[asyncio.AbstractEventLoop] = None
+_local_workers: List[asyncio.Task] = []
+
+
+MAX_ATTEMPTS = int_setting("CONTRACT_JOB_MAX_ATTEMPTS", 5, minimum=1)
+LOCAL_WORKERS = int_setting("CONTRACT_JOB_LOCAL_WORKERS", 2, minimum=1)
+
+
+def job_queue_mode() -> str:
+    mode = os.environ.get("CONTRACT_JOB_QUEUE", "").strip().lower()
+    if mode in ("azure", "local"):
+        return mode
+    return "azure" if os.environ.get("AzureWebJobsStorage") else "local"
+
+
+def is_job_id(value: Optional[str]) -> bool:
+    return bool(value) and _JOB_ID_RE.match(value) is not None
+
+
+def job_status_url(job_id: str, request_url: str | None = None) -> str:
+    path = f"/api/contract_job_status?id={job_id}"
+    if request_url:
+        from urllib.parse import urlsplit
+
+        parts = urlsplit(request_url)
+        return f"{parts.scheme}://{parts.netloc}{path}"
+    return path
+
+
+# ============================================================
+# Status records
+# ============================================================
+
+def _now() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+
+
+async def _write_status(
+    job_id: str,
+    status: str,
+    created_at: str,
+    etag: Optional[str] = None,
+    **fields: Any,
+) -> Dict[str, Any]:
+    # etag None: create (the record must not exist yet)
+    record = {"jobId": job_id, "status": status, "createdAt": created_at, "updatedAt": _now(), **fields}
+    data = json.dumps(record, ensure_ascii=False).encode("utf-8")
+    await write_record_async(f"{job_id}{_STATUS_SUFFIX}", data, etag)
+    return record
+
+
+async def _read_status(job_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    try:
+        data, etag = await read_record_async(f"{job_id}{_STATUS_SUFFIX}")
+    except FileNotFoundError:
+        return None, None
+    return json.loads(data), etag
+
+
+async def read_job_status(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    The job's status record, None when there is none. Raises
+    CircuitOpenError while storage is skipped and storage errors as
+    they are.
+    """
+    record, _ = await _read_status(job_id)
+    return record
+
+
+# ============================================================
+# Submit / process
+# ============================================================
+
+async def submit_job(job: Dict[str, Any], queue_out: Any = None) -> Dict[str, Any]:
+    """
+    Record a prepared job (contract_service.prepare_contract) as pending
+    and enqueue it; `queue_out` is the function's queue output binding
+    (func.Out[str]), unused by the local queue. Returns the status
+    record. A result that is already stored is recorded as done at once.
+    """
+    job_id = new_blob_name(suffix="")
+    created_at = _now()
+
+    if await find_cached_result(job):
+        return await _write_status(job_id, DONE, created_at, fileId=job["fileId"], cached=True)
+
+    # Recorded before it is enqueued: the status endpoint never misses it
+    record = await _write_status(job_id, PENDING, created_at)
+    message = json.dumps({"jobId": job_id, "createdAt": created_at, "job": job}, ensure_ascii=False)
+    if job_queue_mode() == "local":
+        _local_enqueue(message)
+    else:
+        queue_out.set(message)
+    return record
+
+
+async def process_job_message(message: str, attempt: int = 1) -> None:
+    """
+    Render and store one queued job. Raises to have the message retried,
+    except on the last attempt, where the job is recorded as failed.
+    """
+    payload = json.loads(message)
+    job_id, created_at, job = payload["jobId"], payload["createdAt"], payload["job"]
+
+    # Delivered again after it completed (queues are at-least-once)
+    record, etag = await _read_status(job_id)
+    if record is not None and record["status"] != PENDING:
+        return
+
+    try:
+        cached = await find_cached_result(job)
+        file_id = job["fileId"] if cached else await store_contract(job, await render_contract(job, wait=True))
+    except Exception:
+        if attempt < MAX_ATTEMPTS:
+            _logger.warning("Contract job %s failed (attempt %d/%d), retrying", job_id, attempt, MAX_ATTEMPTS)
+            raise
+        _logger.exception("Contract job %s failed after %d attempts", job_id, attempt)
+        await _finish_status(job_id, FAILED, created_at, etag, error="Rendering failed.", attempts=attempt)
+        return
+
+    await _finish_status(job_id, DONE, created_at, etag, fileId=file_id, cached=cached, attempts=attempt)
+
+
+async def _finish_status(job_id: str, status: str, created_at: str, etag: Optional[str], **fields: Any) -> None:
+    try:
+        await _write_status(job_id, status, created_at, etag, **fields)
+    except BlobConflictError:
+        # Another delivery of the same message recorded it first
+        _logger.info("Contract job %s was already finished, keeping that record", job_id)
+
+
+# ============================================================
+# Local queue (offline stand-in)
+# ============================================================
+
+def _local_enqueue(message: str) -> None:
+    global _local_queue, _local_loop, _local_workers
+    loop = asyncio.get_running_loop()
+    if _local_queue is None or _local_loop is not loop:
+        _local_queue = asyncio.Queue()
+        _local_loop = loop
+        _local_workers = [
+            loop.create_task(_local_worker(_local_queue))
+            for _ in range(LOCAL_WORKERS)
+        ]
+    _local_queue.put_nowait(message)
+
+
+async def _local_worker(queue: asyncio.Queue) -> None:
+    while True:
+        message = await queue.get()
+        try:
+            attempt = 1
+            while True:
+                try:
+                    await process_job_message(message, attempt)
+                    break
+                except Exception:
+                    if attempt >= MAX_ATTEMPTS:
+                        _logger.exception("Dropped contract job message after %d attempts", attempt)
+                        break
+                    # Like a queue message becoming visible again
+                    await asyncio.sleep(min(_RETRY_MAX_DELAY, 2.0 ** attempt))
+                    attempt += 1
+        finally:
+            queue.task_done()
+
+
+async def drain_local_jobs() -> None:
+    """
+    Wait until the local queue has processed every job (tests, scripts).
+    """
+    if _local_queue is not None and _local_loop is asyncio.get_running_loop():
+        await _local_queue.join()
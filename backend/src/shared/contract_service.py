@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from src.shared.admission import get_render_admission
+from src.shared.generator_docx import warm_render_backend
+from src.shared.mapping import build_render_context
+from src.shared.normalize import apply_defaults, normalize_mask_a, normalize_mask_b
+from src.shared.render_pool import configure_render_pool, render_docx_async
+from src.shared.result_cache import (
+    RESULT_CACHE_CONTROL,
+    compute_result_key,
+    forget_result,
+    is_known_result,
+    remember_result,
+    result_blob_name,
+    result_cache_enabled,
+    template_version,
+)
+from src.shared.single_flight import SingleFlight
+from src.shared.storage import blob_exists_async, configure_storage, save_bytes_blob_async
+from src.shared.validate import validate_core
+
+_logger = logging.getLogger(__name__)
+
+# ============================================================
+# Contract generation steps (shared by the HTTP functions)
+# ============================================================
+#
+#   prepare_contract()  normalize + validate one {maskA, maskB, templatePath}
+#   find_cached_result() content-addressed result already stored?
+#   render_contract()   mapping + render (render pool / worker thread),
+#                       admitted by admission.py
+#   store_contract()    upload (random or content-addressed name)
+#
+# A "job" is the dict returned by prepare_contract():
+#   {"maskA", "maskB", "templatePath", "templateFile", "key", "fileId"}
+# key is the canonical hash of the normalized masks and the template
+# (result_cache.compute_result_key); fileId is the result blob name,
+# None when the result cache is off.
+#
+# Concurrent identical jobs (same key) share one render, and one render
+# + upload in render_and_store_contract() (single_flight.py), whether
+# or not the result cache is on.
+
+TEMPLATE_ALLOWLIST = {
+    "base_contract.docx": "templates/base_contract.docx",
+}
+DEFAULT_TEMPLATE = "base_contract.docx"
+
+_warmed = False
+_warm_lock = threading.Lock()
+
+# Background uploads (referenced until done)
+_background_saves: set = set()
+
+_flights = SingleFlight()
+
+
+def warm_contract_service() -> None:
+    """
+    Once per worker, before the first request: compile the allowlisted
+    templates, parse the storage settings and configure the render
+    pool (DOCX_RENDER_POOL_SIZE, started by the first render).
+    """
+    global _warmed
+    with _warm_lock:
+        if _warmed:
+            return
+        warm_render_backend(TEMPLATE_ALLOWLIST.values())
+        for path in TEMPLATE_ALLOWLIST.values():
+            template_version(path)
+        configure_storage()
+        configure_render_pool(TEMPLATE_ALLOWLIST.values())
+        _warmed = True
+
+
+def prepare_contract(
+    body: Any,
+    default_template: str = DEFAULT_TEMPLATE,
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Returns (job, None), or (None, error) with error =
+    {"status": int, "message": str, "details": dict | None}.
+    """
+    if not isinstance(body, dict):
+        return None, {"status": 400, "message": "Body must be a JSON object.", "details": None}
+
+    mask_a = normalize_mask_a(body.get("maskA") or {})
+    mask_b = normalize_mask_b(body.get("maskB") or {})
+
+    mask_a, mask_b = apply_defaults(mask_a, mask_b)
+
+    ok, errors = validate_core(mask_a, mask_b)
+    if not ok:
+        return None, {"status": 422, "message": "Validation failed.", "details": {"errors": errors}}
+
+    template_path = body.get("templatePath") or default_template
+    if template_path not in TEMPLATE_ALLOWLIST:
+        return None, {"status": 400, "message": "Invalid templatePath.", "details": None}
+
+    template_file = TEMPLATE_ALLOWLIST[template_path]
+    # Before build_render_context: it may mutate mask_b
+    key = compute_result_key(mask_a, mask_b, template_path, template_file)
+    file_id = result_blob_name(key) if result_cache_enabled() else None
+
+    return {
+        "maskA": mask_a,
+        "maskB": mask_b,
+        "templatePath": template_path,
+        "templateFile": template_file,
+        "key": key,
+        "fileId": file_id,
+    }, None
+
+
+async def find_cached_result(job: Dict[str, Any]) -> bool:
+    """
+    True when the job's content-addressed result is already stored.
+    """
+    file_id = job["fileId"]
+    if file_id is None:
+        return False
+    if is_known_result(file_id) or await blob_exists_async(file_id):
+        remember_result(file_id)
+        return True
+    return False
+
+
+def forget_cached_result(job: Dict[str, Any]) -> None:
+    if job["fileId"] is not None:
+        forget_result(job["fileId"])
+
+
+async def render_contract(job: Dict[str, Any], wait: bool = False) -> bytes:
+    """
+    Raises AdmissionRejected when too many renders are running and
+    queued, unless `wait` (then it waits for a render slot). Joins the
+    render of an identical job already in progress.
+    """
+    return await _coalesced("render", job, lambda: _render(job, wait))
+
+
+async def _render(job: Dict[str, Any], wait: bool) -> bytes:
+    async with get_render_admission().slot(wait=wait):
+        ctx = build_render_context(job["maskA"], job["maskB"])
+        # CPU-bound: render pool or worker thread, the event loop stays
+        # free for in-flight blob I/O
+        return await render_docx_async(job["templateFile"], ctx)
+
+
+async def store_contract(job: Dict[str, Any], docx_bytes: bytes) -> str:
+    """
+    Upload the rendered contract; returns its fileId.
+    """
+    file_id = job["fileId"]
+    if file_id is None:
+        return await save_bytes_blob_async(docx_bytes, suffix=".docx")
+    await save_bytes_blob_async(docx_bytes, blob_name=file_id, cache_control=RESULT_CACHE_CONTROL)
+    remember_result(file_id)
+    return file_id
+
+
+async def render_and_store_contract(job: Dict[str, Any]) -> str:
+    """
+    render_contract() + store_contract(); identical concurrent jobs get
+    the same fileId.
+    """
+    async def work() -> str:
+        return await store_contract(job, await render_contract(job))
+
+    return await _coalesced("store", job, work)
+
+
+def store_contract_in_background(job: Dict[str, Any], docx_bytes: bytes) -> None:
+    """
+    store_contract() after the response, for content-addressed results
+    (only they can be found again). Must run on the event loop.
+    """
+    if job["fileId"] is None:
+        return
+
+    async def save() -> None:
+        try:
+            # Identical inline requests: one upload
+            await _coalesced("save", job, lambda: store_contract(job, docx_bytes))
+        except Exception:
+            _logger.exception("Background save of %s failed", job["fileId"])
+
+    task = asyncio.get_running_loop().create_task(save())
+    _background_saves.add(task)
+    task.add_done_callback(_background_saves.discard)
+
+
+async def drain_background_saves() -> None:
+    """
+    Wait for the uploads started by store_contract_in_background()
+    (tests, scripts).
+    """
+    while _background_saves:
+        await asyncio.gather(*list(_background_saves), return_exceptions=True)
+
+
+def get_single_flight_stats() -> Dict[str, int]:
+    """
+    {"in_flight", "flights", "coalesced"}: renders / uploads started,
+    and identical requests that joined one instead.
+    """
+    return _flights.stats()
+
+
+async def _coalesced(stage: str, job: Dict[str, Any], work):
+    # Jobs queued by older versions have no key
+    if not job.get("key"):
+        return await work()
+    return await _flights.do((stage, job["key"]), work)
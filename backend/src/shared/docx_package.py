@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import struct
+import zipfile
+import zlib
+from typing import Dict, List
+
+# ============================================================
+# DOCX package writer with zip passthrough
+# ============================================================
+#
+# A render only modifies the text parts (document, headers, footers)
+# that contain placeholders. Styles, fonts, theme, settings,
+# numbering, ... are byte-identical to the template, so their ALREADY
+# COMPRESSED bytes are copied straight into the output archive. Only
+# the replaced parts are deflated again.
+#
+# The archive layout is read once per template version (cached as a
+# template artifact, see template_cache.get_compiled_template).
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_OF_CENTRAL_DIR = struct.Struct("<IHHHHIIH")
+
+_LOCAL_SIG = 0x04034B50
+_CENTRAL_SIG = 0x02014B50
+_END_SIG = 0x06054B50
+
+_VERSION = 20
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+
+
+def read_template_package(template_path: str) -> List[Dict[str, object]]:
+    """
+    Read every archive entry of a template: metadata, raw compressed
+    bytes and the uncompressed data (for backends that parse parts).
+    """
+    entries: List[Dict[str, object]] = []
+
+    with zipfile.ZipFile(template_path) as archive, open(template_path, "rb") as handle:
+        for info in archive.infolist():
+            if info.flag_bits & 0x01:
+                raise ValueError(f"Encrypted template entry not supported: {info.filename}")
+
+            handle.seek(info.header_offset)
+            header = _LOCAL_HEADER.unpack(handle.read(_LOCAL_HEADER.size))
+            name_len, extra_len = header[9], header[10]
+            handle.seek(name_len + extra_len, 1)
+            raw = handle.read(info.compress_size)
+
+            name = info.filename.encode("utf-8")
+            flags = info.flag_bits & ~_FLAG_DATA_DESCRIPTOR
+            if not info.filename.isascii():
+                flags |= _FLAG_UTF8
+
+            entry = {
+                "name": info.filename,
+                "name_bytes": name,
+                "flags": flags,
+                "method": info.compress_type,
+                "dos_time": _dos_time(info.date_time),
+                "dos_date": _dos_date(info.date_time),
+                "external_attr": info.external_attr,
+                "crc": info.CRC,
+                "compress_size": info.compress_size,
+                "file_size": info.file_size,
+                "data": archive.read(info.filename),
+            }
+            # Pre-serialized local entry, copied verbatim on passthrough
+            entry["local"] = _local_header(entry) + name + raw
+            entries.append(entry)
+
+    return entries
+
+
+def write_docx_package(entries: List[Dict[str, object]], replacements: Dict[str, bytes]) -> bytes:
+    """
+    Build the output archive in template order.
+
+    Entries named in `replacements` are deflated from the new bytes,
+    all others are passed through without recompression.
+    """
+    chunks: List[bytes] = []
+    central: List[bytes] = []
+    offset = 0
+
+    for entry in entries:
+        data = replacements.get(entry["name"])
+        if data is None:
+            local = entry["local"]
+            meta = entry
+        else:
+            compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+            raw = compressor.compress(data) + compressor.flush()
+            meta = dict(
+                entry,
+                method=zipfile.ZIP_DEFLATED,
+                crc=zlib.crc32(data),
+                compress_size=len(raw),
+                file_size=len(data),
+            )
+            local = _local_header(meta) + entry["name_bytes"] + raw
+
+        central.append(_central_header(meta, offset) + entry["name_bytes"])
+        chunks.append(local)
+        offset += len(local)
+
+    central_dir = b"".join(central)
+    chunks.append(central_dir)
+    chunks.append(
+        _END_OF_CENTRAL_DIR.pack(
+            _END_SIG, 0, 0, len(entries), len(entries), len(central_dir), offset, 0
+        )
+    )
+    return b"".join(chunks)
+
+
+# ============================================================
+# Low-level helpers
+# ============================================================
+
+def _local_header(meta: Dict[str, object]) -> bytes:
+    return _LOCAL_HEADER.pack(
+        _LOCAL_SIG,
+        _VERSION,
+        meta["flags"],
+        meta["method"],
+        meta["dos_time"],
+        meta["dos_date"],
+        meta["crc"],
+        meta["compress_size"],
+        meta["file_size"],
+        len(meta["name_bytes"]),
+        0,
+    )
+
+
+def _central_header(meta: Dict[str, object], offset: int) -> bytes:
+    return _CENTRAL_HEADER.pack(
+        _CENTRAL_SIG,
+        _VERSION,
+        _VERSION,
+        meta["flags"],
+        meta["method"],
+        meta["dos_time"],
+        meta["dos_date"],
+        meta["crc"],
+        meta["compress_size"],
+        meta["file_size"],
+        len(meta["name_bytes"]),
+        0,
+        0,
+        0,
+        0,
+        meta["external_attr"],
+        offset,
+    )
+
+
+def _dos_time(date_time) -> int:
+    return (date_time[3] << 11) | (date_time[4] << 5) | (date_time[5] // 2)
+
+
+def _dos_date(date_time) -> int:
+    return ((date_time[0] - 1980) << 9) | (date_time[1] << 5) | date_time[2]
@@ -6,10 +6,16 @@ from typing import Any, Dict, Optional
 import azure.functions as func
 
 
-def json_response(payload: Dict[str, Any], status_code: int = 200) -> func.HttpResponse:
+def json_response(
+    payload: Dict[str, Any],
+    status_code: int = 200,
+    *,
+    headers: Optional[Dict[str, str]] = None,
+) -> func.HttpResponse:
     return func.HttpResponse(
         body=json.dumps(payload, ensure_ascii=False),
         status_code=status_code,
+        headers=headers,
         mimetype="application/json",
     )
 
@@ -1,10 +1,23 @@
 from __future__ import annotations
 
-from io import BytesIO
-from typing import Dict
-from docx import Document
-from docx.shared import Cm
-from docx.oxml import OxmlElement
+import logging
+import os
+from typing import Callable, Dict, Optional, Tuple
+from docx.opc.oxml import serialize_part_xml
+from docx.text.paragraph import Paragraph
+
+from src.shared.docx_package import write_docx_package
+from src.shared.placeholder_index import PLACEHOLDER_RE, resolve_path
+from src.shared.table_slots import build_table, is_table_value
+from src.shared.template_cache import (
+    get_compiled_template,
+    load_template_package,
+    load_template_with_index,
+    text_part_roots,
+    warm_templates,
+)
+
+_logger = logging.getLogger(__name__)
 
 # ============================================================
 # Core public API
@@ -13,6 +26,7 @@ from docx.oxml import OxmlElement
 def generate_docx_from_template(
     template_path: str,
     ctx: Dict[str, str],
+    on_unknown_placeholder: Optional[Callable[[str], None]] = None,
 ) -> bytes:
     """
     Generate final DOCX by replacing placeholders in a lawyer-approved template.
@@ -27,27 +41,92 @@ def generate_docx_from_template(
     Placeholder rules:
     ------------------
     - Inline placeholders like [VERMIETER_NAME] can appear anywhere
+      (body, tables, nested tables, text boxes, headers, footers)
     - Block placeholders like [SR_BLOCK] MUST be alone in a paragraph
+      directly in the document body
     - Empty block values REMOVE the paragraph completely
+    - Inline placeholders without a value stay in the output and are
+      reported through `on_unknown_placeholder` (default: log warning)
+
+    Backend:
+    --------
+    - DOCX_RENDER_BACKEND=python-docx (default): python-docx object model
+    - DOCX_RENDER_BACKEND=xml: raw lxml rendering of the text parts
+      (see generator_xml.py), same output
+    - DOCX_RENDER_BACKEND=plan: precompiled static chunks + slots
+      (see generator_plan.py), same output
+    """
+
+    if on_unknown_placeholder is None:
+        on_unknown_placeholder = _log_unknown_placeholder
+
+    backend = os.environ.get("DOCX_RENDER_BACKEND", "python-docx")
+
+    # Alternative backend working directly on the XML parts
+    if backend == "xml":
+        from src.shared.generator_xml import generate_docx_from_template_xml
+
+        return generate_docx_from_template_xml(template_path, ctx, on_unknown_placeholder)
+
+    # Alternative backend rendering from a precompiled plan
+    if backend == "plan":
+        from src.shared.generator_plan import generate_docx_from_template_plan
+
+        return generate_docx_from_template_plan(template_path, ctx, on_unknown_placeholder)
+
+    # Load the DOCX template (parsed once per worker, copied per render)
+    # together with its precomputed placeholder index
+    doc, index = load_template_with_index(template_path)
+    part_roots = text_part_roots(doc)
+
+    # Resolve every slot BEFORE mutating (paths are child positions)
+    targets = [
+        (Paragraph(resolve_path(part_roots[part_name], path), None), block_key)
+        for part_name, path, _, block_key in index["slots"]
+    ]
+
+    # ONE pass over the slots of all text parts (body, tables, nested
+    # tables, text boxes, headers, footers): inline, block and table
+    # placeholders are dispatched per paragraph
+    for paragraph, block_key in targets:
+        render_paragraph_slot(doc, paragraph, block_key, ctx, on_unknown_placeholder)
+
+    # Save final document to memory (no disk write here).
+    # Only parts containing placeholders change during a render; every
+    # other part is passed through with its template-compressed bytes.
+    return write_docx_package(
+        load_template_package(template_path),
+        {
+            part_name: serialize_part_xml(part_roots[part_name])
+            for part_name in index["parts"]
+        },
+    )
+
+
+def warm_render_backend(template_paths) -> None:
+    """
+    Parse / compile templates for the configured DOCX_RENDER_BACKEND
+    ahead of the first request (call at worker startup).
     """
+    backend = os.environ.get("DOCX_RENDER_BACKEND", "python-docx")
 
-    # Load the DOCX template
-    doc = Document(template_path)
+    if backend == "xml":
+        from src.shared.generator_xml import compile_xml_template
 
-    # 1️⃣ Replace inline placeholders in normal paragraphs
-    for paragraph in doc.paragraphs:
-        replace_inline_placeholders(paragraph, ctx)
+        for template_path in template_paths:
+            get_compiled_template(template_path, "xml", compile_xml_template)
+            load_template_package(template_path)
+        return
 
-    # 2️⃣ Replace inline placeholders inside tables
-    replace_placeholders_in_tables(doc, ctx)
+    if backend == "plan":
+        from src.shared.generator_plan import compile_render_plan
 
-    # 3️⃣ Replace or remove block placeholders
-    replace_block_placeholders(doc, ctx)
+        for template_path in template_paths:
+            get_compiled_template(template_path, "plan", compile_render_plan)
+            load_template_package(template_path)
+        return
 
-    # Save final document to memory (no disk write here)
-    bio = BytesIO()
-    doc.save(bio)
-    return bio.getvalue()
+    warm_templates(template_paths)
 
 
 # ============================================================
@@ -97,7 +176,39 @@ def build_placeholder_context(maskA: dict, maskB: dict) -> Dict[str, str]:
 # Inline placeholder replacement
 # ============================================================
 
-def replace_inline_placeholders(paragraph, ctx: Dict[str, str]) -> None:
+def substitute_placeholders(
+    text: str,
+    ctx: Dict[str, str],
+    on_unknown: Optional[Callable[[str], None]] = None,
+) -> Tuple[str, bool]:
+    """
+    Replace ALL [KEY] placeholders of `text` in a single regex scan.
+
+    Returns (new_text, replaced). Placeholders without a string value
+    in `ctx` are left untouched and reported through `on_unknown`.
+    Replacement values are never scanned again.
+    """
+    replaced = False
+
+    def _substitute(match):
+        nonlocal replaced
+        value = ctx.get(match.group(1))
+        # Inline replacement ONLY supports strings
+        if isinstance(value, str):
+            replaced = True
+            return value
+        if on_unknown is not None:
+            on_unknown(match.group(1))
+        return match.group(0)
+
+    return PLACEHOLDER_RE.sub(_substitute, text), replaced
+
+
+def replace_inline_placeholders(
+    paragraph,
+    ctx: Dict[str, str],
+    on_unknown: Optional[Callable[[str], None]] = None,
+) -> None:
     """
     Replace placeholders inside a paragraph.
 
@@ -108,22 +219,11 @@ def replace_inline_placeholders(paragraph, ctx: Dict[str, str]) -> None:
     the paragraph if needed.
     """
 
-    if not paragraph.text:
-        return
-
     full_text = paragraph.text
-    replaced = False
-
-    for key, value in ctx.items():
-        # Inline replacement ONLY supports strings
-        if not isinstance(value, str):
-            continue
-
-        placeholder = f"[{key}]"
-        if placeholder in full_text:
-            full_text = full_text.replace(placeholder, value)
-            replaced = True
+    if not full_text:
+        return
 
+    full_text, replaced = substitute_placeholders(full_text, ctx, on_unknown)
 
     if not replaced:
         return
@@ -133,119 +233,52 @@ def replace_inline_placeholders(paragraph, ctx: Dict[str, str]) -> None:
     paragraph.add_run(full_text)
 
 
-# ============================================================
-# Table handling
-# ============================================================
+def _log_unknown_placeholder(key: str) -> None:
+    _logger.warning("Template placeholder [%s] has no value in ctx", key)
 
-def replace_placeholders_in_tables(doc, ctx: Dict[str, str]) -> None:
-    """
-    Apply inline placeholder replacement inside tables.
-    Word tables behave differently than normal paragraphs.
-    """
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for paragraph in cell.paragraphs:
-                    replace_inline_placeholders(paragraph, ctx)
-
-# ============================================================
-# Special table insertion: § 5 Miete / Betriebskosten
-# ============================================================
 
-def insert_miete_bk_table_after_paragraph(doc, paragraph, rows):
-    """
-    Insert a formatted 2-column table (Beschreibung | Betrag)
-    directly after the placeholder paragraph.
+def render_paragraph_slot(
+    doc,
+    paragraph,
+    block_key,
+    ctx: Dict[str, str],
+    on_unknown: Optional[Callable[[str], None]] = None,
+) -> None:
     """
+    Render one indexed paragraph.
 
-    table = doc.add_table(rows=len(rows) + 1, cols=2)
-    table.autofit = False
-
-    # Header
-    table.cell(0, 0).text = "Beschreibung"
-    table.cell(0, 1).text = "Betrag (EUR)"
-
-    # Data rows
-    for i, (label, amount) in enumerate(rows, start=1):
-        table.cell(i, 0).text = label
-        table.cell(i, 1).text = amount
-
-    # Column widths (legal-doc friendly)
-    set_table_column_widths(table, [12.5, 4.0])
-
-    # Borders
-    set_table_borders(table)
-
-    # ✅ Vertical alignment (CENTER for all cells)
-    for row in table.rows:
-        for cell in row.cells:
-            set_cell_vertical_alignment(cell, "center")
+    Block placeholders (`block_key` set) with a string value are rendered
+    inline; missing / non-string values REMOVE the paragraph, a row list
+    for a table placeholder is inserted as a real table first.
+    """
+    if block_key is not None:
+        value = ctx.get(block_key)
+        if not isinstance(value, str):
+            # Real DOCX table (§ 5 Miete / BK, see table_slots.py)
+            if is_table_value(block_key, value):
+                insert_table_after_paragraph(doc, paragraph, block_key, value)
 
-    # Row heights
-    set_row_height(table.rows[0], 0.95)   # header
-    for row in table.rows[1:-1]:
-        set_row_height(row, 1.25)          # normal rows
-        set_row_height(table.rows[-1], 0.95) # total row
+            delete_paragraph(paragraph)
+            return
 
-    # Insert table after placeholder
-    paragraph._p.addnext(table._tbl)
+        # Block placeholder paragraphs are never left behind
+        on_unknown = None
 
+    replace_inline_placeholders(paragraph, ctx, on_unknown)
 
 
 # ============================================================
-# Block placeholder handling
+# Table placeholder insertion (see table_slots.py)
 # ============================================================
 
-def replace_block_placeholders(doc, ctx: Dict[str, str]) -> None:
+def insert_table_after_paragraph(doc, paragraph, key: str, rows) -> None:
     """
-    Replace placeholders that MUST be alone in a paragraph.
+    Insert the table registered for `key` with `rows`
+    directly after the placeholder paragraph.
     """
+    table = build_table(key, rows, doc._block_width)
+    paragraph._p.addnext(table._tbl)
 
-    block_keys = [
-        "PRAEAMBEL_BLOCK",
-        "MPB_BLOCK",
-        "WEG_BLOCK",
-        "SR_BLOCK",
-        "ANNEX_LIST",
-        "CLAUSE_KUENDIGUNGSAUSSCHLUSS",
-        "CLAUSE_NEBENKOSTEN",
-        "STAFFEL_BLOCK",
-        "ANNEX_BLOCK",
-        "CLAUSE_UNTERVERMIETUNG",
-        "CLAUSE_TIERHALTUNG",
-        "CLAUSE_SCHOENHEITSREPARATUREN",
-        "CLAUSE_ENDRUECKGABE",
-        "CLAUSE_DATENVERARBEITUNG_ENERGIE_ANLAGEN",
-    ]
-
-    for paragraph in list(doc.paragraphs):
-        text = paragraph.text.strip()
-
-        # ====================================================
-        # SPECIAL CASE: Real DOCX table for § 5
-        # ====================================================
-        if text == "[MIETE_BK_TABELLE]":
-            rows = ctx.get("MIETE_BK_TABELLE", [])
-
-            if rows:
-                insert_miete_bk_table_after_paragraph(doc, paragraph, rows)
-
-            delete_paragraph(paragraph)
-            continue
-
-        # ====================================================
-        # Normal block placeholders
-        # ====================================================
-        for key in block_keys:
-            placeholder = f"[{key}]"
-            if text == placeholder:
-                value = ctx.get(key, "")
-
-                if isinstance(value, str) and value.strip():
-                    clear_paragraph(paragraph)
-                    paragraph.add_run(value)
-                else:
-                    delete_paragraph(paragraph)
 
 # ============================================================
 # Low-level helpers (DO NOT TOUCH)
@@ -273,67 +306,6 @@ def delete_paragraph(paragraph) -> None:
     p.getparent().remove(p)
     p._p = p._element = None
 
-from docx.oxml import OxmlElement, ns
-
-def set_table_borders(table):
-    """
-    Apply full borders to a table (Word-compatible, safe).
-    """
-    tbl = table._tbl
-    tblPr = tbl.tblPr
-
-    borders = OxmlElement("w:tblBorders")
-
-    for edge in ("top", "left", "bottom", "right", "insideH", "insideV"):
-        element = OxmlElement(f"w:{edge}")
-        element.set(ns.qn("w:val"), "single")
-        element.set(ns.qn("w:sz"), "8")       # border thickness
-        element.set(ns.qn("w:space"), "0")
-        element.set(ns.qn("w:color"), "000000")
-        borders.append(element)
-
-    tblPr.append(borders)
-
-def set_table_column_widths(table, widths_cm):
-    """
-    widths_cm = list of column widths in centimeters
-    """
-    table.autofit = False
-
-    for row in table.rows:
-        for idx, width in enumerate(widths_cm):
-            row.cells[idx].width = Cm(width)
-
-from docx.oxml import OxmlElement, ns
-
-def set_cell_vertical_alignment(cell, align="center"):
-    """
-    Vertically align content inside a table cell.
-    align: 'top' | 'center' | 'bottom'
-    """
-    tc = cell._tc
-    tcPr = tc.get_or_add_tcPr()
-
-    vAlign = OxmlElement("w:vAlign")
-    vAlign.set(ns.qn("w:val"), align)
-
-    tcPr.append(vAlign)
-
-
-
-def set_row_height(row, height_cm: float):
-    """
-    Set exact row height in centimeters.
-    """
-    tr = row._tr
-    trPr = tr.get_or_add_trPr()
-
-    trHeight = OxmlElement("w:trHeight")
-    trHeight.set(ns.qn("w:val"), str(int(height_cm * 567)))  # cm → twips
-    trHeight.set(ns.qn("w:hRule"), "exact")
-
-    trPr.append(trHeight)
-
 # ============================================================
 # Legal logic: Kündigung & Laufzeit (STEP 6)
 # ============================================================
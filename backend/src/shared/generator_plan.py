@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import copy
+import re
+from typing import Callable, Dict, List, Optional
+from xml.sax.saxutils import escape
+
+from docx.opc.oxml import serialize_part_xml
+from docx.oxml.ns import nsmap
+from lxml import etree
+
+from src.shared.docx_package import write_docx_package
+from src.shared.generator_docx import substitute_placeholders
+from src.shared.generator_xml import RUN_SPLIT_RE, W_R, W_RPR, compile_xml_template
+from src.shared.placeholder_index import resolve_path
+from src.shared.table_slots import is_table_value, render_table_xml
+from src.shared.template_cache import get_compiled_template, load_template_package
+
+# ============================================================
+# Precompiled render plan
+# ============================================================
+#
+# Each text part of the template (word/document.xml, headers, footers)
+# with placeholders is compiled ONCE into:
+#
+#   chunk[0] slot[0] chunk[1] slot[1] ... chunk[n]
+#
+# where chunks are pre-serialized static XML bytes and slots are the
+# paragraphs containing placeholders. A render is a join of chunks and
+# escaped slot values — no XML parsing, copying or tree manipulation.
+#
+# Slot types:
+#   - inline: paragraph with [KEY] placeholders (anywhere)
+#   - block:  paragraph that is ONLY a block placeholder; removed when
+#             the value is missing / not a string
+#   - table:  block slot whose row list becomes a real DOCX table,
+#             emitted from a pre-serialized skeleton (table_slots.py)
+#
+# Placeholders split by Word across several runs are normalized at
+# compile time: each slot stores the joined paragraph text plus the
+# paragraph with all runs already cleared, so the runtime only emits
+# one new run (same markup as the other backends).
+
+_SLOT_START = "slot-start"
+_SLOT_END = "slot-end"
+_SLOT_RUN = "slot-run"
+
+_SLOT_RE = re.compile(rb"<\?slot-start (\d+)\?>(.*?)<\?slot-end \1\?>", re.DOTALL)
+
+# Characters lxml refuses to serialize (XML 1.0)
+_INVALID_XML_CHARS_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+
+
+# ============================================================
+# Core public API
+# ============================================================
+
+def generate_docx_from_template_plan(
+    template_path: str,
+    ctx: Dict[str, str],
+    on_unknown_placeholder: Optional[Callable[[str], None]] = None,
+) -> bytes:
+    """
+    Render `template_path` with `ctx` from its precompiled render plan.
+
+    Placeholder rules are the ones of `generate_docx_from_template`.
+    """
+    plan = get_compiled_template(template_path, "plan", compile_render_plan)
+
+    rendered = {}
+    for part_name, part in plan["parts"].items():
+        chunks = part["chunks"]
+        out: List[bytes] = [chunks[0]]
+        for slot, chunk in zip(part["slots"], chunks[1:]):
+            out.append(_render_slot(slot, ctx, on_unknown_placeholder, plan["block_width"]))
+            out.append(chunk)
+        rendered[part_name] = b"".join(out)
+
+    return write_docx_package(load_template_package(template_path), rendered)
+
+
+# ============================================================
+# Plan compilation (once per template version)
+# ============================================================
+
+def compile_render_plan(template_path: str) -> Dict[str, object]:
+    """
+    Compile every text part with placeholders into static chunks and typed slots.
+    """
+    xml = get_compiled_template(template_path, "xml", compile_xml_template)
+    index = xml["index"]
+
+    parts = {}
+    for part_name in index["parts"]:
+        slots = [slot for slot in index["slots"] if slot[0] == part_name]
+        parts[part_name] = _compile_part(xml["roots"][part_name], slots)
+
+    return {"parts": parts, "block_width": xml["block_width"]}
+
+
+def _compile_part(master_root, index_slots) -> Dict[str, object]:
+    root = copy.deepcopy(master_root)
+    if root.nsmap.get("w") != nsmap["w"]:
+        raise ValueError("Template part must bind the 'w' prefix on its root")
+
+    targets = [resolve_path(root, path) for _, path, _, _ in index_slots]
+
+    # Pass 1: original paragraphs (emitted when nothing gets replaced)
+    for i, p in enumerate(targets):
+        p.addprevious(etree.ProcessingInstruction(_SLOT_START, str(i)))
+        p.addnext(etree.ProcessingInstruction(_SLOT_END, str(i)))
+    originals = {
+        int(m.group(1)): m.group(2) for m in _SLOT_RE.finditer(serialize_part_xml(root))
+    }
+
+    # Pass 2: paragraphs with cleared runs and a marker for the new run
+    for i, p in enumerate(targets):
+        for r in p.iterchildren(W_R):
+            for child in list(r):
+                if child.tag != W_RPR:
+                    r.remove(child)
+        p.append(etree.ProcessingInstruction(_SLOT_RUN, str(i)))
+    part_xml = serialize_part_xml(root)
+
+    chunks: List[bytes] = []
+    slots: List[Dict[str, object]] = []
+    pos = 0
+    for m in _SLOT_RE.finditer(part_xml):
+        i = int(m.group(1))
+        _, _, text, block_key = index_slots[i]
+        prefix, suffix = m.group(2).split(f"<?{_SLOT_RUN} {i}?>".encode())
+
+        chunks.append(part_xml[pos:m.start()])
+        slots.append(
+            {
+                "text": text,
+                "block_key": block_key,
+                "original": originals[i],
+                "prefix": prefix,
+                "suffix": suffix,
+            }
+        )
+        pos = m.end()
+    chunks.append(part_xml[pos:])
+
+    return {"chunks": chunks, "slots": slots}
+
+
+# ============================================================
+# Slot rendering
+# ============================================================
+
+def _render_slot(slot: Dict[str, object], ctx: Dict[str, str], on_unknown, block_width) -> bytes:
+    key = slot["block_key"]
+    if key is not None:
+        value = ctx.get(key)
+        if not isinstance(value, str):
+            # Table slot: pre-serialized skeleton + rows
+            if is_table_value(key, value):
+                return render_table_xml(key, value, block_width, _run_xml)
+            # Removed block
+            return b""
+        on_unknown = None
+
+    # Inline slot
+    text, replaced = substitute_placeholders(slot["text"], ctx, on_unknown)
+    if not replaced:
+        return slot["original"]
+
+    return slot["prefix"] + _run_xml(text) + slot["suffix"]
+
+
+def _run_xml(text: str) -> bytes:
+    """
+    Serialize a `w:r` exactly like lxml does for paragraph.add_run(text).
+    """
+    if not text:
+        return b"<w:r/>"
+
+    if _INVALID_XML_CHARS_RE.search(text):
+        raise ValueError(
+            "All strings must be XML compatible: Unicode or ASCII, "
+            "no NULL bytes or control characters"
+        )
+
+    parts = ["<w:r>"]
+    for chunk in RUN_SPLIT_RE.split(text):
+        if not chunk:
+            continue
+        if chunk == "\t":
+            parts.append("<w:tab/>")
+        elif chunk in "\r\n":
+            parts.append("<w:br/>")
+        elif len(chunk.strip()) < len(chunk):
+            parts.append(f'<w:t xml:space="preserve">{escape(chunk)}</w:t>')
+        else:
+            parts.append(f"<w:t>{escape(chunk)}</w:t>")
+    parts.append("</w:r>")
+
+    return "".join(parts).encode("utf-8")
+
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import copy
+import re
+from typing import Callable, Dict, Optional
+
+from docx.opc.oxml import serialize_part_xml
+from docx.oxml.ns import qn
+from docx.oxml.parser import parse_xml
+from docx.section import Section
+from lxml import etree
+
+from src.shared.docx_package import write_docx_package
+from src.shared.generator_docx import substitute_placeholders
+from src.shared.placeholder_index import (
+    DOCUMENT_PART,
+    build_placeholder_index,
+    is_text_part,
+    resolve_path,
+)
+from src.shared.table_slots import build_table, is_table_value
+from src.shared.template_cache import get_compiled_template, load_template_package
+
+# ============================================================
+# Raw-XML rendering backend
+# ============================================================
+#
+# Same output as the python-docx backend, without the python-docx
+# object model: no Document / Paragraph / Run proxies, no package
+# graph. Only the text parts (document, headers, footers) are parsed
+# (with the python-docx element classes, so paragraph text is read
+# exactly the same way); every other part is passed through from the
+# template archive.
+#
+# The template is walked ONCE per template version (see
+# placeholder_index.py). A render only deep-copies the roots of the
+# parts containing placeholders and touches the recorded paragraphs.
+
+W_R = qn("w:r")
+W_RPR = qn("w:rPr")
+W_T = qn("w:t")
+W_TAB = qn("w:tab")
+W_BR = qn("w:br")
+XML_SPACE = qn("xml:space")
+
+# Tabs and line breaks become <w:tab/> / <w:br/>, everything else <w:t>
+RUN_SPLIT_RE = re.compile(r"(\t|\r|\n)")
+
+
+# ============================================================
+# Core public API
+# ============================================================
+
+def generate_docx_from_template_xml(
+    template_path: str,
+    ctx: Dict[str, str],
+    on_unknown_placeholder: Optional[Callable[[str], None]] = None,
+) -> bytes:
+    """
+    Render `template_path` with `ctx` working directly on the XML parts.
+
+    Placeholder rules are the ones of `generate_docx_from_template`.
+    """
+    compiled = get_compiled_template(template_path, "xml", compile_xml_template)
+    index = compiled["index"]
+
+    roots = {name: copy.deepcopy(compiled["roots"][name]) for name in index["parts"]}
+
+    # Resolve every slot BEFORE mutating (paths are child positions)
+    targets = [
+        (resolve_path(roots[part_name], path), text, block_key)
+        for part_name, path, text, block_key in index["slots"]
+    ]
+
+    # ONE pass: inline, block and table placeholders
+    for p, text, block_key in targets:
+        on_unknown = on_unknown_placeholder
+
+        if block_key is not None:
+            value = ctx.get(block_key)
+            if not isinstance(value, str):
+                # Real DOCX table (§ 5 Miete / BK, Staffel, Anlagen, ...)
+                if is_table_value(block_key, value):
+                    p.addnext(build_table(block_key, value, compiled["block_width"])._tbl)
+
+                p.getparent().remove(p)
+                continue
+
+            on_unknown = None
+
+        _replace_inline(p, text, ctx, on_unknown)
+
+    return write_docx_package(
+        load_template_package(template_path),
+        {name: serialize_part_xml(root) for name, root in roots.items()},
+    )
+
+
+# ============================================================
+# Template compilation (once per template version)
+# ============================================================
+
+def compile_xml_template(template_path: str) -> Dict[str, object]:
+    """
+    Parse the text parts of a template and index their placeholders.
+    """
+    roots = {
+        entry["name"]: parse_xml(entry["data"])
+        for entry in load_template_package(template_path)
+        if is_text_part(entry["name"])
+    }
+
+    section = Section(roots[DOCUMENT_PART].sectPr_lst[-1], None)
+    block_width = section.page_width - section.left_margin - section.right_margin
+
+    return {
+        "roots": roots,
+        "index": build_placeholder_index(roots),
+        "block_width": block_width,
+    }
+
+
+# ============================================================
+# Element-level helpers
+# ============================================================
+
+def _replace_inline(p, full_text: str, ctx: Dict[str, str], on_unknown) -> None:
+    full_text, replaced = substitute_placeholders(full_text, ctx, on_unknown)
+    if not replaced:
+        return
+
+    # Same markup as clear_paragraph() + paragraph.add_run()
+    for r in p.iterchildren(W_R):
+        for child in list(r):
+            if child.tag != W_RPR:
+                r.remove(child)
+
+    r = etree.SubElement(p, W_R)
+    for chunk in RUN_SPLIT_RE.split(full_text):
+        if not chunk:
+            continue
+        if chunk == "\t":
+            etree.SubElement(r, W_TAB)
+        elif chunk in "\r\n":
+            etree.SubElement(r, W_BR)
+        else:
+            t = etree.SubElement(r, W_T)
+            t.text = chunk
+            if len(chunk.strip()) < len(chunk):
+                t.set(XML_SPACE, "preserve")
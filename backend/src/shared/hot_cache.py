@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+# ============================================================
+# In-process hot cache for freshly generated documents
+# ============================================================
+#
+# generate_contract is almost always followed within seconds by a
+# download of the same fileId. Blobs saved by this worker are kept in
+# memory (LRU, capped in bytes and age), so that download is answered
+# without a storage round trip.
+#
+# Blobs are written once and never modified, so a cached copy cannot
+# go stale before the lifecycle sweeper deletes the blob (days later).
+# ETags of cached blobs are content hashes: another worker serving the
+# same blob from storage reports a different ETag (its client then gets
+# a full 200 instead of a 304 / 206, never wrong bytes).
+#
+# Settings (see storage_backends.load_storage_settings):
+#   HOT_CACHE_MAX_MB       memory per worker (default 64, 0 = disabled)
+#   HOT_CACHE_TTL_SECONDS  entry lifetime (default 600)
+
+
+class HotCache:
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max(0, max_bytes)
+        self.ttl = ttl
+        # One entry may not take more than an eighth of the cache
+        self.max_entry_bytes = self.max_bytes // 8
+
+        self._entries: "OrderedDict[str, Dict[str, object]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def put(self, blob_name: str, data: bytes) -> None:
+        if not self.enabled or len(data) > self.max_entry_bytes:
+            return
+        data = bytes(data)
+        entry = {
+            "data": data,
+            "stored_at": time.monotonic(),
+            "info": {
+                "size": len(data),
+                "etag": f'"{hashlib.sha256(data).hexdigest()[:32]}"',
+                "last_modified": datetime.now(timezone.utc).replace(microsecond=0),
+            },
+        }
+        with self._lock:
+            previous = self._entries.pop(blob_name, None)
+            if previous is not None:
+                self._bytes -= len(previous["data"])
+            self._entries[blob_name] = entry
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted["data"])
+                self._counters["evictions"] += 1
+
+    def get(self, blob_name: str, count: bool = True) -> Optional[Dict[str, object]]:
+        """
+        The entry ({"data", "info"}) or None. `count`: record the
+        lookup as a hit or a miss.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(blob_name)
+            if entry is not None and time.monotonic() - entry["stored_at"] > self.ttl:
+                del self._entries[blob_name]
+                self._bytes -= len(entry["data"])
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(blob_name)
+            if count:
+                self._counters["hits" if entry is not None else "misses"] += 1
+            return entry
+
+    def contains(self, blob_name: str) -> bool:
+        return self.get(blob_name, count=False) is not None
+
+    def discard(self, blob_name: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(blob_name, None)
+            if entry is not None:
+                self._bytes -= len(entry["data"])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                **self._counters,
+            }
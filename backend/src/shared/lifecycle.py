@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import logging
+from datetime import date, datetime, timedelta, timezone
+from time import perf_counter
+from typing import Dict, List, Optional
+
+from src.shared.blob_names import partition_prefix, utc_today
+from src.shared.storage_backends import StorageBackend
+
+_logger = logging.getLogger(__name__)
+
+# ============================================================
+# Contract lifecycle (expired blob sweeper)
+# ============================================================
+#
+# Blobs are named by UTC creation day (blob_names.py), so expiring
+# them never needs a full container listing: the sweeper deletes the
+# partitions of the `lookback_days` days before the retention window,
+# one name prefix at a time. Looking back further than one day catches
+# up on runs that were missed; already-empty partitions cost one empty
+# listing each.
+#
+# Settings:
+#   CONTRACT_RETENTION_DAYS       keep contracts this many days (default 7)
+#   CONTRACT_SWEEP_LOOKBACK_DAYS  expired days checked per run (default 30)
+#   CONTRACT_SWEEP_CONCURRENCY    batch deletes in flight (default 4)
+#
+# Blobs without a date partition (content-addressed results, see
+# result_cache.py, and contracts stored by older versions) are expired
+# by last-modified time instead. They share no name prefix, so this
+# needs one listing of the whole container per run.
+
+
+def expired_partitions(today: date, retention_days: int, lookback_days: int) -> List[str]:
+    """
+    Name prefixes of the expired days to sweep, newest first.
+    """
+    newest_expired = today - timedelta(days=retention_days)
+    return [partition_prefix(newest_expired - timedelta(days=offset)) for offset in range(lookback_days)]
+
+
+def sweep_expired_contracts(
+    backend: StorageBackend,
+    retention_days: int,
+    lookback_days: int,
+    today: Optional[date] = None,
+) -> Dict[str, object]:
+    """
+    Delete every blob older than `retention_days` full days.
+
+    Returns {"deleted": n, "bytes": n, "partitions": [{"prefix",
+    "deleted", "bytes"}] (non-empty ones), "unpartitioned": {"deleted",
+    "bytes"}, "elapsed": seconds}.
+    """
+    start_time = perf_counter()
+    report: Dict[str, object] = {"deleted": 0, "bytes": 0, "partitions": []}
+
+    today = today or utc_today()
+    for prefix in expired_partitions(today, retention_days, lookback_days):
+        result = backend.delete_prefix(prefix)
+        if result["deleted"]:
+            report["partitions"].append({"prefix": prefix, **result})
+            report["deleted"] += result["deleted"]
+            report["bytes"] += result["bytes"]
+
+    # Same cutoff as the partitions: the start of the oldest kept day
+    cutoff = datetime.combine(today - timedelta(days=retention_days - 1), datetime.min.time(), timezone.utc)
+    result = backend.delete_unpartitioned(cutoff)
+    report["unpartitioned"] = result
+    report["deleted"] += result["deleted"]
+    report["bytes"] += result["bytes"]
+
+    report["elapsed"] = round(perf_counter() - start_time, 3)
+    _logger.info(
+        "Lifecycle sweep (%s): deleted %d blob(s), reclaimed %d bytes in %.2fs",
+        backend.name, report["deleted"], report["bytes"], report["elapsed"],
+    )
+    return report
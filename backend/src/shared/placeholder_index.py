@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from docx.oxml.ns import qn
+
+from src.shared.table_slots import TABLE_KEYS
+
+# ============================================================
+# Placeholder location index (built ONCE per template)
+# ============================================================
+#
+# Most paragraphs of a lawyer template are static text. Instead of
+# scanning every paragraph against every ctx key on each request,
+# the template is walked ONCE and the renderers only visit the
+# paragraphs listed here.
+#
+# The walk is a single traversal per text part (main document,
+# headers, footers) that reaches every `w:p` exactly once: body
+# paragraphs, table cells, nested tables, text boxes and content
+# controls alike. Each hit is recorded as a slot:
+#
+#   (part_name, path, text, block_key)
+#
+# - part_name: archive member, e.g. "word/document.xml"
+# - path:      child positions from the part root to the `w:p`
+# - text:      paragraph text in the template (placeholders split
+#              across runs are already joined here)
+# - block_key: set when the paragraph is ONLY a block/table placeholder
+#              directly in the document body, else None
+
+PLACEHOLDER_RE = re.compile(r"\[([A-Za-z0-9_]+)\]")
+
+# Placeholders that MUST be alone in a paragraph
+BLOCK_KEYS = (
+    "PRAEAMBEL_BLOCK",
+    "MPB_BLOCK",
+    "WEG_BLOCK",
+    "SR_BLOCK",
+    "ANNEX_LIST",
+    "CLAUSE_KUENDIGUNGSAUSSCHLUSS",
+    "CLAUSE_NEBENKOSTEN",
+    "STAFFEL_BLOCK",
+    "ANNEX_BLOCK",
+    "CLAUSE_UNTERVERMIETUNG",
+    "CLAUSE_TIERHALTUNG",
+    "CLAUSE_SCHOENHEITSREPARATUREN",
+    "CLAUSE_ENDRUECKGABE",
+    "CLAUSE_DATENVERARBEITUNG_ENERGIE_ANLAGEN",
+)
+
+DOCUMENT_PART = "word/document.xml"
+
+# Parts whose text is rendered: main document, headers and footers
+TEXT_PART_RE = re.compile(r"^word/(document|header\d*|footer\d*)\.xml$")
+
+W_P = qn("w:p")
+W_BODY = qn("w:body")
+
+Path = Tuple[int, ...]
+Slot = Tuple[str, Path, str, Optional[str]]
+
+
+def is_text_part(part_name: str) -> bool:
+    return TEXT_PART_RE.match(part_name) is not None
+
+
+def iter_text_paragraphs(root):
+    """
+    Yield (w:p, in_body) for every paragraph of a part, in document order.
+    """
+    body = root.find(W_BODY)
+    for p in root.iter(W_P):
+        yield p, body is not None and p.getparent() is body
+
+
+def build_placeholder_index(part_roots: Dict[str, object]) -> Dict[str, object]:
+    """
+    Walk the text parts of a template once and record placeholder slots.
+
+    Returns:
+      {
+        "parts": ["word/document.xml", ...],   # parts with slots
+        "slots": [ (part_name, path, text, block_key), ... ],
+      }
+    """
+    slots: List[Slot] = []
+    parts: List[str] = []
+
+    for part_name, root in part_roots.items():
+        found_in_part = False
+
+        for p, in_body in iter_text_paragraphs(root):
+            text = p.text
+            keys = PLACEHOLDER_RE.findall(text) if text else []
+            if not keys:
+                continue
+
+            block_key = None
+            if in_body:
+                stripped = text.strip()
+                for key in keys:
+                    if (key in BLOCK_KEYS or key in TABLE_KEYS) and stripped == f"[{key}]":
+                        block_key = key
+                        break
+
+            slots.append((part_name, element_path(root, p), text, block_key))
+            found_in_part = True
+
+        if found_in_part:
+            parts.append(part_name)
+
+    return {"parts": parts, "slots": slots}
+
+
+def element_path(root, element) -> Path:
+    path = []
+    while element is not root:
+        parent = element.getparent()
+        path.append(parent.index(element))
+        element = parent
+    return tuple(reversed(path))
+
+
+def resolve_path(root, path: Path):
+    element = root
+    for pos in path:
+        element = element[pos]
+    return element
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Optional
+
+from src.shared.generator_docx import generate_docx_from_template, warm_render_backend
+from src.shared.settings import int_setting
+
+_logger = logging.getLogger(__name__)
+
+# ============================================================
+# Process-pool rendering
+# ============================================================
+#
+# Rendering is pure-Python and CPU-bound: concurrent renders in one
+# Functions worker serialize on the GIL. With a pool, each render runs
+# in a child process, so throughput scales with cores.
+#
+# The Functions worker is multi-threaded (gRPC, request threads), so
+# its children are never forked from it directly (a lock held by
+# another thread would be copied locked): they come from a forkserver
+# (spawn where there is none) that has the render modules preloaded,
+# and each child compiles the templates once in its initializer.
+#
+# warm_contract_service() only records the templates; the pool is
+# started by the first render that needs it, not at import.
+#
+# Settings:
+#   DOCX_RENDER_POOL_SIZE = 0 (default, render in a thread of this
+#                           process) | N | auto
+#   auto = CPU cores / FUNCTIONS_WORKER_PROCESS_COUNT, capped by
+#          PYTHON_THREADPOOL_THREAD_COUNT when that is set
+
+# Imported by the forkserver once, before it forks each child
+_PRELOAD_MODULES = ["src.shared.render_pool"]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+_pool_templates: tuple = ()
+_pool_lock = threading.Lock()
+
+
+def resolve_pool_size() -> int:
+    """
+    Number of render processes configured for this worker (0 = no pool).
+    """
+    raw = os.environ.get("DOCX_RENDER_POOL_SIZE", "0").strip().lower()
+    if raw != "auto":
+        try:
+            return max(0, int(raw))
+        except ValueError:
+            _logger.warning("Invalid DOCX_RENDER_POOL_SIZE=%r, rendering without pool", raw)
+            return 0
+
+    worker_processes = int_setting("FUNCTIONS_WORKER_PROCESS_COUNT", 1, minimum=1)
+    size = max(1, (os.cpu_count() or 1) // worker_processes)
+
+    thread_count = int_setting("PYTHON_THREADPOOL_THREAD_COUNT", 0)
+    if thread_count > 0:
+        size = min(size, thread_count)
+    return size
+
+
+def configure_render_pool(template_paths: Iterable[str]) -> int:
+    """
+    Record the templates the render processes compile, and the pool
+    size (0 = no pool). The pool starts with the first render.
+    """
+    global _pool_size, _pool_templates
+    with _pool_lock:
+        _pool_templates = tuple(template_paths)
+        _pool_size = resolve_pool_size()
+    return _pool_size
+
+
+def start_render_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Start the configured render processes (no-op when they run or the
+    pool is disabled: renders then run in a thread of this process).
+    """
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None or _pool_size <= 0:
+            return _pool
+        _pool = ProcessPoolExecutor(
+            max_workers=_pool_size,
+            mp_context=_pool_context(),
+            initializer=_init_worker,
+            initargs=(_pool_templates,),
+        )
+        _logger.info("Render pool started with %d processes", _pool_size)
+        return _pool
+
+
+def shutdown_render_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def render_docx(template_path: str, ctx: Dict[str, object]) -> bytes:
+    """
+    Render in the pool (blocking). Falls back to in-process rendering.
+    """
+    pool = _pool or start_render_pool()
+    if pool is None:
+        return generate_docx_from_template(template_path=template_path, ctx=ctx)
+
+    try:
+        return pool.submit(_render_in_worker, template_path, ctx).result()
+    except BrokenProcessPool:
+        _restart_broken_pool(pool)
+        return generate_docx_from_template(template_path=template_path, ctx=ctx)
+
+
+async def render_docx_async(template_path: str, ctx: Dict[str, object]) -> bytes:
+    """
+    Render without blocking the event loop: in the pool if configured,
+    else in a worker thread.
+    """
+    pool = _pool or start_render_pool()
+    if pool is None:
+        return await asyncio.to_thread(
+            generate_docx_from_template, template_path=template_path, ctx=ctx
+        )
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(pool, _render_in_worker, template_path, ctx)
+    except BrokenProcessPool:
+        _restart_broken_pool(pool)
+        return await asyncio.to_thread(
+            generate_docx_from_template, template_path=template_path, ctx=ctx
+        )
+
+
+# ============================================================
+# Helpers
+# ============================================================
+
+def _pool_context():
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(_PRELOAD_MODULES)
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def _init_worker(template_paths: tuple) -> None:
+    # Once per child, before its first render
+    warm_render_backend(template_paths)
+
+
+def _render_in_worker(template_path: str, ctx: Dict[str, object]) -> bytes:
+    return generate_docx_from_template(template_path=template_path, ctx=ctx)
+
+
+def _restart_broken_pool(broken: ProcessPoolExecutor) -> None:
+    global _pool
+    _logger.error("Render pool broken (child process died), restarting it")
+    with _pool_lock:
+        if _pool is not broken:
+            return
+        _pool = None
+        broken.shutdown(wait=False, cancel_futures=True)
+    start_render_pool()
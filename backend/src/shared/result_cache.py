@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict
+
+from src.shared.template_cache import get_compiled_template
+
+# ============================================================
+# Content-addressed render results
+# ============================================================
+#
+# Lawyers regenerate the same contract many times while reviewing.
+# The rendered DOCX is a pure function of:
+#
+#   normalized maskA + normalized maskB + template + renderer
+#
+# so the result blob is named after a hash of exactly these inputs.
+# A repeated request finds the blob already stored and returns its
+# fileId / download URL without normalizing into a ctx, rendering or
+# uploading again. Content-addressed blobs never change, so they are
+# served with immutable cache headers.
+#
+# Result blob names carry no date partition (blob_names.py): the same
+# input maps to the same name on every day, so a regeneration after
+# midnight still hits. The lifecycle sweeper expires them by age
+# (lifecycle.py).
+#
+# RENDER_REVISION MUST be bumped whenever a code change alters the
+# rendered output for the same input (mapping, clauses, generator).
+
+RENDER_REVISION = "1"
+
+RESULT_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+# sha256 hex + suffix (UUID-named blobs are 32 hex chars)
+_RESULT_NAME_RE = re.compile(r"^[0-9a-f]{64}\.[a-z]+$")
+
+# Bounded, short-lived memo of result blob names confirmed to exist in
+# storage (saves the existence check on rapid regenerations; expires so
+# blobs removed from storage are noticed)
+_KNOWN_RESULTS_MAX = 4096
+_KNOWN_RESULTS_TTL_SECONDS = 300.0
+_known_results: Dict[str, float] = {}
+_known_lock = threading.Lock()
+
+
+def result_cache_enabled() -> bool:
+    return os.environ.get("RESULT_CACHE_ENABLED", "true").strip().lower() not in ("0", "false", "no", "off")
+
+
+def template_version(template_path: str) -> str:
+    """
+    Content hash of a template file (stable across workers and deploys).
+    """
+    return get_compiled_template(template_path, "digest", _file_digest)
+
+
+def compute_result_key(
+    mask_a: Dict[str, Any],
+    mask_b: Dict[str, Any],
+    template_id: str,
+    template_path: str,
+) -> str:
+    """
+    Canonical hash of everything the rendered document depends on.
+
+    Call BEFORE build_render_context (it may mutate mask_b).
+    """
+    payload = {
+        "revision": RENDER_REVISION,
+        "template": template_id,
+        "templateVersion": template_version(template_path),
+        "maskA": _canonical_mask(mask_a),
+        "maskB": _canonical_mask(mask_b),
+    }
+    encoded = json.dumps(
+        payload,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    ).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def result_blob_name(result_key: str, suffix: str = ".docx") -> str:
+    return f"{result_key}{suffix}"
+
+
+def is_result_blob(blob_name: str) -> bool:
+    """
+    True for content-addressed (immutable) result blob names.
+    """
+    return _RESULT_NAME_RE.match(blob_name or "") is not None
+
+
+def is_known_result(blob_name: str) -> bool:
+    seen_at = _known_results.get(blob_name)
+    return seen_at is not None and time.monotonic() - seen_at < _KNOWN_RESULTS_TTL_SECONDS
+
+
+def remember_result(blob_name: str) -> None:
+    with _known_lock:
+        _known_results.pop(blob_name, None)
+        _known_results[blob_name] = time.monotonic()
+        while len(_known_results) > _KNOWN_RESULTS_MAX:
+            del _known_results[next(iter(_known_results))]
+
+
+def forget_result(blob_name: str) -> None:
+    with _known_lock:
+        _known_results.pop(blob_name, None)
+
+
+# ============================================================
+# Helpers
+# ============================================================
+
+def _canonical_mask(mask: Dict[str, Any]) -> Dict[str, Any]:
+    # `_raw` is the un-normalized request copy kept by normalize.py;
+    # rendering only reads normalized fields.
+    return {key: value for key, value in (mask or {}).items() if key != "_raw"}
+
+
+def _file_digest(template_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(template_path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
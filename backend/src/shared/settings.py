@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import logging
+import os
+from typing import Optional
+
+_logger = logging.getLogger(__name__)
+
+# ============================================================
+# Numeric app settings
+# ============================================================
+#
+# Environment variables (Function App settings) parsed the same way
+# everywhere: empty / unset → default, invalid → default with a
+# warning, then clamped to `minimum` when given.
+
+
+def int_setting(name: str, default: int, minimum: Optional[int] = None) -> int:
+    return _clamp(_parse(name, default, int), minimum)
+
+
+def float_setting(name: str, default: float, minimum: Optional[float] = None) -> float:
+    return _clamp(_parse(name, default, float), minimum)
+
+
+def _parse(name: str, default, parse):
+    raw = os.environ.get(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return parse(raw)
+    except ValueError:
+        _logger.warning("Invalid %s=%r, using %s", name, raw, default)
+        return default
+
+
+def _clamp(value, minimum):
+    return value if minimum is None else max(minimum, value)
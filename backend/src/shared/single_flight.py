@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+# ============================================================
+# Single-flight request coalescing
+# ============================================================
+#
+# Double-clicks and client retries send identical generate requests
+# within milliseconds. The first caller for a key runs the work; every
+# caller arriving while it runs awaits the same task and gets the same
+# result (or exception) instead of rendering and uploading again.
+#
+# The key is removed as soon as the work finishes: later callers start
+# a new flight (by then the result cache, if enabled, answers them).
+# A caller that is cancelled does not cancel the shared work.
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._counters = {"flights": 0, "coalesced": 0}
+
+    async def do(self, key: Hashable, work: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Result of `work()`, run once for all concurrent callers of `key`.
+        """
+        loop = asyncio.get_running_loop()
+        flight = self._flights.get(key)
+        if flight is None or flight.get_loop() is not loop:
+            flight = loop.create_task(work())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda done: self._finish(key, done))
+            counter = "flights"
+        else:
+            counter = "coalesced"
+        with self._lock:
+            self._counters[counter] += 1
+        return await asyncio.shield(flight)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"in_flight": len(self._flights), **self._counters}
+
+    def _finish(self, key: Hashable, flight: asyncio.Future) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Retrieved here, so a failure every caller stopped waiting for
+        # is not reported as "never retrieved"
+        if not flight.cancelled():
+            flight.exception()
@@ -1,163 +1,293 @@
 from __future__ import annotations
 
 import logging
-import os
 import threading
-import uuid
-from time import perf_counter
-from typing import Tuple
-from datetime import datetime, timedelta
-
-from azure.core.exceptions import (
-    HttpResponseError,
-    ResourceExistsError,
-    ResourceNotFoundError,
-    ServiceRequestError,
+from typing import Dict, Optional, Tuple
+
+from src.shared.blob_names import new_blob_name
+from src.shared.circuit_breaker import CircuitOpenError
+from src.shared.hot_cache import HotCache
+from src.shared.storage_backends import (
+    DOCX_CONTENT_TYPE,
+    BlobConflictError,
+    StorageBackend,
+    create_storage_backend,
+    load_storage_settings,
 )
-from azure.core.pipeline.policies import RetryPolicy
-from azure.core.pipeline.transport import RequestsTransport
-from azure.storage.blob import BlobServiceClient, ContentSettings
-
-LOCAL_CONTRACTS_DIR = os.environ.get("LOCAL_CONTRACTS_DIR", "/tmp/contracts-temp")
-_container_client = None
-_container_created = False
-_container_lock = threading.Lock()
+
 _logger = logging.getLogger(__name__)
 
+# ============================================================
+# Contract storage (public API)
+# ============================================================
+#
+# Thin functions over ONE StorageBackend (see storage_backends.py),
+# resolved on first use from settings parsed once per process:
+#
+#   STORAGE_BACKEND=azure|local|memory
+#   (default: azure when AzureWebJobsStorage is set, else local)
+#   STORAGE_WRITE_BEHIND=true: Azure uploads go through a local spool
+#   and a background uploader (see write_behind.py)
+#
+# Reads raise CircuitOpenError while Azure is skipped (circuit open)
+# and there is no local copy to serve instead.
+#
+# Blobs saved by this worker are also kept in an in-process hot cache
+# (hot_cache.py) and read from there while they are fresh.
+#
+# Call configure_storage() at warmup to resolve it ahead of the first
+# request, or set_storage_backend() to inject one (tests, benchmarks).
 
-class _NoHostsRequestsTransport(RequestsTransport):
-    def send(self, request, **kwargs):
-        kwargs.pop("hosts", None)
-        kwargs.pop("location_mode", None)
-        return super().send(request, **kwargs)
-
-
-def _use_azure_storage() -> bool:
-    return bool(os.environ.get("AzureWebJobsStorage"))
-
-
-def _get_blob_service():
-    conn = os.environ["AzureWebJobsStorage"]
-    api_version = os.environ.get("AZURE_STORAGE_API_VERSION", "2021-12-02")
-    retry_policy = RetryPolicy(total_retries=3)
-    transport = _NoHostsRequestsTransport(connection_timeout=10, read_timeout=30)
-    return BlobServiceClient.from_connection_string(
-        conn,
-        api_version=api_version,
-        retry_policy=retry_policy,
-        transport=transport,
-    )
-
-
-def _get_container_client():
-    global _container_client
-    if _container_client is None:
-        container = os.environ.get("AZURE_STORAGE_CONTAINER_CONTRACTS", "contracts-temp")
-        _container_client = _get_blob_service().get_container_client(container)
-    return _container_client
-
-
-def _ensure_container_created():
-    global _container_created
-    if _container_created:
-        return
-    with _container_lock:
-        if _container_created:
-            return
-        try:
-            _get_container_client().create_container()
-        except ResourceExistsError:
-            pass
-        _container_created = True
-
-
-def _write_local(blob_name: str, data: bytes) -> str:
-    os.makedirs(LOCAL_CONTRACTS_DIR, exist_ok=True)
-    file_path = os.path.join(LOCAL_CONTRACTS_DIR, blob_name)
-    with open(file_path, "wb") as handle:
-        handle.write(data)
-    return blob_name
+_backend: Optional[StorageBackend] = None
+_backend_lock = threading.Lock()
+_settings: Optional[Dict[str, object]] = None
+_hot_cache = HotCache(0, 0)
+
+
+def configure_storage() -> StorageBackend:
+    """
+    (Re)read the storage settings and resolve the backend.
+    """
+    global _backend, _hot_cache, _settings
+    settings = load_storage_settings()
+    backend = create_storage_backend(settings)
+    with _backend_lock:
+        _backend = backend
+        _settings = settings
+        _hot_cache = HotCache(settings["hot_cache_bytes"], settings["hot_cache_ttl"])
+    _logger.info("Storage backend: %s", backend.name)
+    return backend
 
 
-def _read_local(blob_name: str) -> bytes:
-    file_path = os.path.join(LOCAL_CONTRACTS_DIR, blob_name)
-    with open(file_path, "rb") as handle:
-        return handle.read()
+def set_storage_backend(backend: Optional[StorageBackend]) -> None:
+    """
+    Use `backend` for every storage call (None: resolve from settings again).
+    """
+    global _backend
+    with _backend_lock:
+        _backend = backend
+        _hot_cache.clear()
 
 
-def save_bytes_blob(data: bytes, suffix=".docx") -> str:
+def get_storage_settings() -> Dict[str, object]:
+    """
+    The settings parsed by the last configure_storage().
     """
-    Saves file to Azure Blob Storage and returns blob name.
-    Falls back to local storage when Azure configuration is missing.
+    if _settings is None:
+        configure_storage()
+    return _settings
+
+
+def get_storage_backend() -> StorageBackend:
+    backend = _backend
+    if backend is not None:
+        return backend
+    with _backend_lock:
+        if _backend is not None:
+            return _backend
+    return configure_storage()
+
+
+# ============================================================
+# Sync API
+# ============================================================
+
+def save_bytes_blob(
+    data: bytes,
+    suffix=".docx",
+    blob_name: str | None = None,
+    cache_control: str | None = None,
+) -> str:
     """
-    blob_name = f"{uuid.uuid4().hex}{suffix}"
-    if not _use_azure_storage():
-        return _write_local(blob_name, data)
+    Saves file to the storage backend and returns blob name.
+    The Azure backend falls back to local storage when an upload fails.
 
-    blob_client = _get_container_client()
-    try:
-        _ensure_container_created()
-        start_time = perf_counter()
-        blob_client.upload_blob(
-            name=blob_name,
-            data=data,
-            overwrite=True,
-            content_settings=ContentSettings(
-                content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-            ),
-        )
-        elapsed = perf_counter() - start_time
-        _logger.info("Uploaded blob %s in %.2fs", blob_name, elapsed)
-        return blob_name
-    except (HttpResponseError, ServiceRequestError):
-        return _write_local(blob_name, data)
+    `blob_name` defaults to a random name in today's date partition
+    (see blob_names.py); pass a name to store content-addressed results
+    (see result_cache.py).
+    """
+    blob_name = get_storage_backend().save(blob_name or new_blob_name(suffix), data, cache_control)
+    _hot_cache.put(blob_name, data)
+    return blob_name
 
 
 def read_bytes_blob(blob_name: str) -> bytes:
     """
-    Read file from Azure Blob Storage or local storage.
-    Falls back to local storage when Azure is unavailable.
+    Read file from the storage backend.
     """
-    if not _use_azure_storage():
-        return _read_local(blob_name)
+    entry = _hot_cache.get(blob_name)
+    if entry is not None:
+        return entry["data"]
+    return get_storage_backend().read(blob_name)
+
 
-    blob_client = _get_container_client().get_blob_client(blob_name)
-    try:
-        start_time = perf_counter()
-        payload = blob_client.download_blob().readall()
-        elapsed = perf_counter() - start_time
-        _logger.info("Downloaded blob %s in %.2fs", blob_name, elapsed)
-        return payload
-    except (HttpResponseError, ServiceRequestError):
-        return _read_local(blob_name)
-    except ResourceNotFoundError:
-        if os.path.exists(os.path.join(LOCAL_CONTRACTS_DIR, blob_name)):
-            return _read_local(blob_name)
-        raise
+def blob_exists(blob_name: str) -> bool:
+    """
+    Check whether a blob exists in the storage backend.
+    """
+    return _hot_cache.contains(blob_name) or get_storage_backend().exists(blob_name)
+
+
+# ============================================================
+# Async API
+# ============================================================
+#
+# Same semantics, for `async def` function entry points: a slow blob
+# call only suspends its request, so one worker overlaps many
+# in-flight uploads and downloads.
+
+async def save_bytes_blob_async(
+    data: bytes,
+    suffix=".docx",
+    blob_name: str | None = None,
+    cache_control: str | None = None,
+) -> str:
+    """
+    Async save_bytes_blob().
+    """
+    blob_name = await get_storage_backend().save_async(blob_name or new_blob_name(suffix), data, cache_control)
+    _hot_cache.put(blob_name, data)
+    return blob_name
+
+
+async def read_bytes_blob_async(blob_name: str) -> bytes:
+    """
+    Async read_bytes_blob().
+    """
+    entry = _hot_cache.get(blob_name)
+    if entry is not None:
+        return entry["data"]
+    return await get_storage_backend().read_async(blob_name)
+
+
+async def blob_exists_async(blob_name: str) -> bool:
+    """
+    Async blob_exists().
+    """
+    return _hot_cache.contains(blob_name) or await get_storage_backend().exists_async(blob_name)
+
+
+async def get_blob_info_async(blob_name: str) -> Dict[str, object]:
+    """
+    Size, ETag (quoted) and Last-Modified (UTC) of a blob,
+    without downloading it. Raises when the blob does not exist.
+    """
+    entry = _hot_cache.get(blob_name)
+    if entry is not None:
+        return dict(entry["info"])
+    return await get_storage_backend().info_async(blob_name)
+
+
+async def read_blob_range_async(
+    blob_name: str,
+    offset: int = 0,
+    length: Optional[int] = None,
+    etag: Optional[str] = None,
+) -> bytes:
+    """
+    Read `length` bytes from `offset` (None = to the end). With `etag`
+    (from get_blob_info_async), raises BlobConflictError when the blob
+    was replaced in between.
+    """
+    # Not counted: get_blob_info_async() already did for this download
+    entry = _hot_cache.get(blob_name, count=False)
+    if entry is not None and (etag is None or entry["info"]["etag"] == etag):
+        data = entry["data"]
+        return data[offset:] if length is None else data[offset:offset + length]
+    return await get_storage_backend().read_range_async(blob_name, offset, length, etag)
+
+
+# ============================================================
+# Records
+# ============================================================
+#
+# Small mutable blobs shared between instances (job status). They go
+# straight to the primary store: no hot cache, no write-behind spool,
+# no local fallback.
+
+async def read_record_async(blob_name: str) -> Tuple[bytes, str]:
+    """
+    (data, etag) of a record. Raises FileNotFoundError when there is
+    none, CircuitOpenError while storage is skipped.
+    """
+    return await get_storage_backend().read_record_async(blob_name)
+
+
+async def write_record_async(blob_name: str, data: bytes, etag: Optional[str] = None) -> str:
+    """
+    Create a record (`etag` None) or replace the version read with
+    `etag`; returns the new etag. Raises BlobConflictError when it
+    already exists / was changed meanwhile.
+    """
+    return await get_storage_backend().write_record_async(blob_name, data, etag)
+
+
+# ============================================================
+# Download URLs
+# ============================================================
+#
+# With Azure storage and an account key in the connection string,
+# clients get a short-lived, read-only SAS URL and download straight
+# from storage (signed offline, no network call). Otherwise downloads
+# go through /api/download_contract.
+
+def get_signed_blob_url(blob_name: str) -> Optional[str]:
+    """
+    Short-lived read-only direct URL for a blob, or None when the
+    backend cannot sign one (no Azure, no account key, local-only blob).
+    """
+    return get_storage_backend().signed_url(blob_name)
+
+
+def get_storage_pool_stats() -> Dict[str, object]:
+    """
+    Blob client connection counters: {"sync"|"async": {"created",
+    "reused", "in_use"}}. Empty for backends without network I/O.
+    """
+    return get_storage_backend().pool_stats()
+
+
+def get_storage_breaker_stats() -> Optional[Dict[str, object]]:
+    """
+    Storage circuit breaker: {"state": "closed"|"open"|"half_open",
+    "consecutive_failures", "retry_after", "opened", "rejected",
+    "probes"}. None for backends without a breaker.
+    """
+    return get_storage_backend().breaker_stats()
+
+
+def get_storage_spool_stats() -> Optional[Dict[str, object]]:
+    """
+    Write-behind uploads: {"pending", "spooled", "uploaded", "retries",
+    "inline"}. None unless STORAGE_WRITE_BEHIND is enabled.
+    """
+    return get_storage_backend().spool_stats()
+
+
+def get_hot_cache_stats() -> Dict[str, int]:
+    """
+    In-process hot cache: {"entries", "bytes", "max_bytes", "hits",
+    "misses", "evictions"}.
+    """
+    return _hot_cache.stats()
+
+
+def is_blob_hot(blob_name: str) -> bool:
+    """
+    True while a blob saved by this worker is served from memory.
+    """
+    return _hot_cache.contains(blob_name)
 
 
 def get_download_url(blob_name: str, request_url: str | None = None) -> str:
     """
     Return download URL for the blob.
     """
-    if _use_azure_storage():
-        conn = os.environ.get("AzureWebJobsStorage", "")
-        conn_parts = {
-            part.split("=", 1)[0]: part.split("=", 1)[1]
-            for part in conn.split(";")
-            if "=" in part
-        }
-        blob_endpoint = conn_parts.get("BlobEndpoint") or conn_parts.get("blobendpoint")
-        if blob_endpoint:
-            container = os.environ.get("AZURE_STORAGE_CONTAINER_CONTRACTS", "contracts-temp")
-            return f"{blob_endpoint.rstrip('/')}/{container}/{blob_name}"
-        if "UseDevelopmentStorage=true" in conn or "UseDevelopmentStorage=True" in conn:
-            container = os.environ.get("AZURE_STORAGE_CONTAINER_CONTRACTS", "contracts-temp")
-            azurite_endpoint = os.environ.get(
-                "AZURITE_BLOB_ENDPOINT",
-                "http://127.0.0.1:10000/devstoreaccount1",
-            )
-            return f"{azurite_endpoint}/{container}/{blob_name}"
+    backend = get_storage_backend()
+    direct = backend.signed_url(blob_name) or backend.public_url(blob_name)
+    if direct:
+        return direct
+
     if request_url:
         from urllib.parse import urlsplit
 
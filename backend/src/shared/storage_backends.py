@@ -0,0 +1,1253 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import mmap
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote
+
+from azure.core import MatchConditions
+from azure.core.exceptions import (
+    HttpResponseError,
+    ResourceExistsError,
+    ResourceModifiedError,
+    ResourceNotFoundError,
+    ServiceRequestError,
+    ServiceResponseError,
+)
+from azure.core.pipeline.policies import AsyncRetryPolicy, RetryPolicy
+from azure.storage.blob import (
+    BlobSasPermissions,
+    BlobServiceClient,
+    ContentSettings,
+    generate_blob_sas,
+)
+from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+
+from src.shared.blob_http import build_async_transport, build_sync_transport, get_pool_stats
+from src.shared.blob_names import blob_partition, strip_partition
+from src.shared.circuit_breaker import OPEN, CircuitBreaker, CircuitOpenError
+from src.shared.settings import int_setting
+
+_logger = logging.getLogger(__name__)
+
+# ============================================================
+# Storage backends
+# ============================================================
+#
+# One interface, three implementations:
+#
+#   - AzureBlobStorageBackend: Azure Blob Storage (sync + aio clients),
+#     falls back to the local directory when Azure calls fail, and
+#     skips Azure while its circuit breaker is open
+#   - LocalStorageBackend:     files in LOCAL_CONTRACTS_DIR (sharded,
+#     atomic writes, optionally TTL / size-capped)
+#   - MemoryStorageBackend:    process memory (tests, benchmarks)
+#
+# Settings (connection string, container, endpoints, signing key, ...)
+# are parsed ONCE by load_storage_settings(); storage.py resolves the
+# backend once per process and every call goes straight to it.
+#
+# Blob info dicts: {"size": int, "etag": '"quoted"', "last_modified": aware UTC datetime}
+#
+# Records (read_record / write_record) are small blobs that change and
+# are shared between instances (job status): they always go to the
+# primary store, never to a local fallback, spool or cache, and are
+# written with an ETag condition.
+
+DOCX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+class BlobConflictError(Exception):
+    """
+    A conditional write or read found the blob already created or
+    changed since its ETag was read (see StorageBackend.write_record,
+    StorageBackend.read_range).
+    """
+
+
+# Well-known Azurite / storage emulator account (public, documented)
+_DEV_ACCOUNT_NAME = "devstoreaccount1"
+_DEV_ACCOUNT_KEY = (
+    "Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw=="
+)
+
+# Clock skew tolerance for the SAS start time
+_SAS_CLOCK_SKEW = timedelta(minutes=5)
+
+# Local store: temp files of interrupted writes are deleted after an hour
+_LOCAL_TMP_SUFFIX = ".tmp"
+_LOCAL_TMP_MAX_AGE = 3600
+
+# Blob batch requests take at most 256 sub-requests
+_DELETE_BATCH_SIZE = 256
+
+# Azure errors that trigger the local fallback
+_STORAGE_ERRORS = (HttpResponseError, ServiceRequestError, ServiceResponseError)
+
+
+# ============================================================
+# Settings (parsed once)
+# ============================================================
+
+def load_storage_settings() -> Dict[str, object]:
+    """
+    Read every storage-related app setting and parse the connection string.
+    """
+    conn = os.environ.get("AzureWebJobsStorage", "")
+    conn_parts = {
+        part.split("=", 1)[0].strip().lower(): part.split("=", 1)[1].strip()
+        for part in conn.split(";")
+        if "=" in part
+    }
+    development = conn_parts.get("usedevelopmentstorage", "").lower() == "true"
+
+    if development:
+        signing_account = (_DEV_ACCOUNT_NAME, _DEV_ACCOUNT_KEY)
+    elif conn_parts.get("accountname") and conn_parts.get("accountkey"):
+        signing_account = (conn_parts["accountname"], conn_parts["accountkey"])
+    else:
+        signing_account = None
+
+    url_ttl_seconds = int_setting("DOWNLOAD_URL_TTL_SECONDS", 900)
+    local_dir = os.environ.get("LOCAL_CONTRACTS_DIR", "/tmp/contracts-temp")
+
+    return {
+        "backend": os.environ.get("STORAGE_BACKEND", "").strip().lower(),
+        "connection_string": conn,
+        "development": development,
+        "has_blob_endpoint": bool(conn_parts.get("blobendpoint")),
+        "blob_endpoint": _blob_endpoint(conn_parts, development),
+        "signing_account": signing_account,
+        "container": os.environ.get("AZURE_STORAGE_CONTAINER_CONTRACTS", "contracts-temp"),
+        "api_version": os.environ.get("AZURE_STORAGE_API_VERSION", "2021-12-02"),
+        "local_dir": local_dir,
+        # Local store (LocalStorageBackend): sharding, eviction, mmap reads
+        "local_shard_chars": int_setting("LOCAL_STORE_SHARD_CHARS", 2, minimum=0),
+        "local_ttl": int_setting("LOCAL_STORE_TTL_SECONDS", 0, minimum=0),
+        "local_max_bytes": int_setting("LOCAL_STORE_MAX_MB", 0, minimum=0) * 1024 * 1024,
+        "local_mmap": os.environ.get("LOCAL_STORE_MMAP", "false").strip().lower() in ("1", "true", "yes"),
+        "local_sweep_interval": int_setting("LOCAL_STORE_SWEEP_SECONDS", 300, minimum=1),
+        "url_ttl": timedelta(seconds=max(60, url_ttl_seconds)),
+        # Blob client connection pool (see blob_http.py)
+        "http_pool_size": int_setting("AZURE_STORAGE_POOL_SIZE", 32, minimum=1),
+        "http_keepalive": int_setting("AZURE_STORAGE_KEEPALIVE_SECONDS", 60, minimum=0),
+        "http_connect_timeout": int_setting("AZURE_STORAGE_CONNECT_TIMEOUT", 10, minimum=1),
+        "http_read_timeout": int_setting("AZURE_STORAGE_READ_TIMEOUT", 30, minimum=1),
+        # Circuit breaker: open after N consecutive failures, probe after M seconds
+        "breaker_failures": int_setting("STORAGE_BREAKER_FAILURES", 5, minimum=1),
+        "breaker_reset": int_setting("STORAGE_BREAKER_RESET_SECONDS", 30, minimum=1),
+        # Write-behind uploads (see write_behind.py)
+        "write_behind": os.environ.get("STORAGE_WRITE_BEHIND", "false").strip().lower() in ("1", "true", "yes"),
+        "spool_dir": os.environ.get("STORAGE_SPOOL_DIR", "").strip() or None,
+        "upload_workers": int_setting("STORAGE_UPLOAD_WORKERS", 4, minimum=1),
+        "spool_max_pending": int_setting("STORAGE_SPOOL_MAX_PENDING", 256, minimum=1),
+        # In-process hot cache (see hot_cache.py)
+        "hot_cache_bytes": int_setting("HOT_CACHE_MAX_MB", 64, minimum=0) * 1024 * 1024,
+        "hot_cache_ttl": int_setting("HOT_CACHE_TTL_SECONDS", 600, minimum=1),
+        # Lifecycle sweeper (see lifecycle.py)
+        "retention_days": int_setting("CONTRACT_RETENTION_DAYS", 7, minimum=1),
+        "sweep_lookback_days": int_setting("CONTRACT_SWEEP_LOOKBACK_DAYS", 30, minimum=1),
+        "sweep_concurrency": int_setting("CONTRACT_SWEEP_CONCURRENCY", 4, minimum=1),
+    }
+
+
+def _blob_endpoint(conn_parts: Dict[str, str], development: bool) -> Optional[str]:
+    if conn_parts.get("blobendpoint"):
+        return conn_parts["blobendpoint"].rstrip("/")
+    if development:
+        return os.environ.get(
+            "AZURITE_BLOB_ENDPOINT",
+            "http://127.0.0.1:10000/devstoreaccount1",
+        ).rstrip("/")
+    account = conn_parts.get("accountname")
+    if account:
+        protocol = conn_parts.get("defaultendpointsprotocol", "https")
+        suffix = conn_parts.get("endpointsuffix", "core.windows.net")
+        return f"{protocol}://{account}.blob.{suffix}"
+    return None
+
+
+# ============================================================
+# Interface
+# ============================================================
+
+class StorageBackend:
+    """
+    Blob store for generated contracts.
+
+    Async methods default to running the sync method in a worker
+    thread; backends with native async I/O override them.
+    """
+
+    name = "base"
+
+    def save(self, blob_name: str, data: bytes, cache_control: Optional[str] = None) -> str:
+        raise NotImplementedError
+
+    def read(self, blob_name: str) -> bytes:
+        raise NotImplementedError
+
+    def read_range(
+        self,
+        blob_name: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+        etag: Optional[str] = None,
+    ) -> bytes:
+        """
+        `length` bytes from `offset` (None = to the end). With `etag`,
+        only of that version: raises BlobConflictError when the blob
+        was replaced since (info() and read_range() are separate calls).
+        """
+        if etag is not None and self.info(blob_name)["etag"] != etag:
+            raise BlobConflictError(blob_name)
+        data = self.read(blob_name)
+        return data[offset:] if length is None else data[offset:offset + length]
+
+    def exists(self, blob_name: str) -> bool:
+        raise NotImplementedError
+
+    def info(self, blob_name: str) -> Dict[str, object]:
+        raise NotImplementedError
+
+    def signed_url(self, blob_name: str) -> Optional[str]:
+        """Direct, time-limited download URL (None: not supported)."""
+        return None
+
+    def public_url(self, blob_name: str) -> Optional[str]:
+        """Unsigned direct URL (None: not supported)."""
+        return None
+
+    def pool_stats(self) -> Dict[str, object]:
+        """HTTP connection pool counters (empty: no network I/O)."""
+        return {}
+
+    def breaker_stats(self) -> Optional[Dict[str, object]]:
+        """Circuit breaker state and counters (None: no breaker)."""
+        return None
+
+    def spool_stats(self) -> Optional[Dict[str, object]]:
+        """Write-behind upload counters (None: uploads are synchronous)."""
+        return None
+
+    def delete_prefix(self, prefix: str) -> Dict[str, int]:
+        """
+        Delete every blob whose name starts with `prefix` (a date
+        partition, see blob_names.py). Returns {"deleted", "bytes"}.
+        """
+        raise NotImplementedError
+
+    def delete_unpartitioned(self, older_than: datetime) -> Dict[str, int]:
+        """
+        Delete every blob without a date partition (content-addressed
+        results, names of older versions) last modified before
+        `older_than` (UTC). Returns {"deleted", "bytes"}.
+        """
+        raise NotImplementedError
+
+    def read_record(self, blob_name: str) -> Tuple[bytes, str]:
+        """
+        (data, etag) of a record. Raises FileNotFoundError when there is
+        none.
+        """
+        raise NotImplementedError
+
+    def write_record(self, blob_name: str, data: bytes, etag: Optional[str] = None) -> str:
+        """
+        Create a record (`etag` None) or replace the version read with
+        `etag`; returns the new etag. Raises BlobConflictError when the
+        record already exists / has changed meanwhile.
+        """
+        raise NotImplementedError
+
+    async def save_async(self, blob_name: str, data: bytes, cache_control: Optional[str] = None) -> str:
+        return await asyncio.to_thread(self.save, blob_name, data, cache_control)
+
+    async def read_async(self, blob_name: str) -> bytes:
+        return await asyncio.to_thread(self.read, blob_name)
+
+    async def read_range_async(
+        self,
+        blob_name: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+        etag: Optional[str] = None,
+    ) -> bytes:
+        return await asyncio.to_thread(self.read_range, blob_name, offset, length, etag)
+
+    async def exists_async(self, blob_name: str) -> bool:
+        return await asyncio.to_thread(self.exists, blob_name)
+
+    async def info_async(self, blob_name: str) -> Dict[str, object]:
+        return await asyncio.to_thread(self.info, blob_name)
+
+    async def read_record_async(self, blob_name: str) -> Tuple[bytes, str]:
+        return await asyncio.to_thread(self.read_record, blob_name)
+
+    async def write_record_async(self, blob_name: str, data: bytes, etag: Optional[str] = None) -> str:
+        return await asyncio.to_thread(self.write_record, blob_name, data, etag)
+
+
+# ============================================================
+# Local filesystem
+# ============================================================
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Files in `directory`, sharded by the first `shard_chars` characters
+    of the blob name (ab/abcd....docx) so no directory grows huge;
+    date-partitioned names get a directory per day on top
+    (20261018/ab/20261018-abcd....docx).
+
+    Writes go to a temp file renamed into place: readers never see a
+    partial file. With `ttl` / `max_bytes`, a background sweep (at most
+    every `sweep_interval` seconds, started by save) deletes files older
+    than `ttl` seconds, then the oldest files while the store is larger
+    than `max_bytes`. Blobs stored flat by older versions are still
+    found (and swept).
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        shard_chars: int = 0,
+        ttl: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        use_mmap: bool = False,
+        sweep_interval: int = 300,
+    ):
+        self.directory = directory
+        self.shard_chars = shard_chars
+        self.ttl = ttl or None
+        self.max_bytes = max_bytes or None
+        self.use_mmap = use_mmap
+        self.sweep_interval = sweep_interval
+
+        self._sweep_lock = threading.Lock()
+        self._next_sweep = 0.0
+        self._record_lock = threading.Lock()
+
+    def path(self, blob_name: str) -> str:
+        if not blob_name or blob_name.startswith(".") or "/" in blob_name or "\\" in blob_name:
+            raise ValueError(f"Invalid blob name: {blob_name!r}")
+        return os.path.join(self.directory, *self._shard_dirs(blob_name), blob_name)
+
+    def _shard_dirs(self, blob_name: str) -> list:
+        # <YYYYMMDD>/<xx>/ for date-partitioned names, <xx>/ otherwise
+        partition = blob_partition(blob_name)
+        dirs = [partition] if partition else []
+        if self.shard_chars:
+            dirs.append(strip_partition(blob_name)[:self.shard_chars])
+        return dirs
+
+    def _existing_path(self, blob_name: str) -> str:
+        path = self.path(blob_name)
+        if self.shard_chars and not os.path.exists(path):
+            legacy = os.path.join(self.directory, blob_name)
+            if os.path.exists(legacy):
+                return legacy
+        return path
+
+    def save(self, blob_name: str, data: bytes, cache_control: Optional[str] = None) -> str:
+        path = self.path(blob_name)
+        shard_dir = os.path.dirname(path)
+        os.makedirs(shard_dir, exist_ok=True)
+        tmp_path = os.path.join(shard_dir, f".{blob_name}.{uuid.uuid4().hex}{_LOCAL_TMP_SUFFIX}")
+        try:
+            with open(tmp_path, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+        self._maybe_sweep()
+        return blob_name
+
+    def read(self, blob_name: str) -> bytes:
+        return self.read_range(blob_name)
+
+    def read_range(
+        self,
+        blob_name: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+        etag: Optional[str] = None,
+    ) -> bytes:
+        with open(self._existing_path(blob_name), "rb") as handle:
+            # Files are replaced by rename: the open file is one version
+            if etag is not None and _stat_etag(os.fstat(handle.fileno())) != etag:
+                raise BlobConflictError(blob_name)
+            if self.use_mmap:
+                size = os.fstat(handle.fileno()).st_size
+                if offset >= size:
+                    return b""
+                with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return mapped[offset:] if length is None else mapped[offset:offset + length]
+            handle.seek(offset)
+            return handle.read() if length is None else handle.read(length)
+
+    def exists(self, blob_name: str) -> bool:
+        try:
+            return os.path.exists(self._existing_path(blob_name))
+        except ValueError:
+            return False
+
+    async def exists_async(self, blob_name: str) -> bool:
+        # A single stat: not worth a thread hop
+        return self.exists(blob_name)
+
+    def info(self, blob_name: str) -> Dict[str, object]:
+        stat = os.stat(self._existing_path(blob_name))
+        return {
+            "size": stat.st_size,
+            "etag": _stat_etag(stat),
+            "last_modified": datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc),
+        }
+
+    # ----------------------------------------------------
+    # Eviction sweep
+    # ----------------------------------------------------
+
+    def _maybe_sweep(self) -> None:
+        if self.ttl is None and self.max_bytes is None:
+            return
+        now = time.monotonic()
+        if now < self._next_sweep or not self._sweep_lock.acquire(blocking=False):
+            return
+        self._next_sweep = now + self.sweep_interval
+        threading.Thread(target=self._sweep_in_background, name="local-store-sweep", daemon=True).start()
+
+    def _sweep_in_background(self) -> None:
+        try:
+            result = self.sweep()
+            if result["removed"]:
+                _logger.info(
+                    "Local store sweep removed %d file(s), %d bytes (%d bytes kept)",
+                    result["removed"], result["removed_bytes"], result["kept_bytes"],
+                )
+        except Exception:
+            _logger.exception("Local store sweep failed")
+        finally:
+            self._sweep_lock.release()
+
+    def sweep(self) -> Dict[str, int]:
+        """
+        Delete expired files, then the oldest ones down to 90% of
+        max_bytes. Returns {"removed", "removed_bytes", "kept_bytes"}.
+        """
+        now = time.time()
+        removed = removed_bytes = 0
+        kept = []
+
+        for entry in self._iter_files():
+            stat = entry.stat()
+            age = now - stat.st_mtime
+            if entry.name.endswith(_LOCAL_TMP_SUFFIX):
+                # Leftover of an interrupted write
+                if age > _LOCAL_TMP_MAX_AGE and _remove_quietly(entry.path):
+                    removed_bytes += stat.st_size
+                continue
+            if self.ttl is not None and age > self.ttl:
+                if _remove_quietly(entry.path):
+                    removed += 1
+                    removed_bytes += stat.st_size
+                continue
+            kept.append((stat.st_mtime, stat.st_size, entry.path))
+
+        kept_bytes = sum(size for _, size, _ in kept)
+        if self.max_bytes is not None and kept_bytes > self.max_bytes:
+            target = int(self.max_bytes * 0.9)
+            kept.sort()
+            for _, size, path in kept:
+                if kept_bytes <= target:
+                    break
+                if _remove_quietly(path):
+                    removed += 1
+                    removed_bytes += size
+                    kept_bytes -= size
+
+        return {"removed": removed, "removed_bytes": removed_bytes, "kept_bytes": kept_bytes}
+
+    def delete_prefix(self, prefix: str) -> Dict[str, int]:
+        partition = blob_partition(prefix)
+        if partition and prefix == f"{partition}-":
+            # A whole day: one directory tree
+            root = os.path.join(self.directory, partition)
+            if not os.path.isdir(root):
+                return {"deleted": 0, "bytes": 0}
+            entries = list(self._iter_files(root))
+        else:
+            entries = [entry for entry in self._iter_files() if entry.name.startswith(prefix)]
+
+        deleted = deleted_bytes = 0
+        for entry in entries:
+            if entry.name.endswith(_LOCAL_TMP_SUFFIX):
+                continue
+            size = entry.stat().st_size
+            if _remove_quietly(entry.path):
+                deleted += 1
+                deleted_bytes += size
+        if partition and prefix == f"{partition}-":
+            shutil.rmtree(os.path.join(self.directory, partition), ignore_errors=True)
+        return {"deleted": deleted, "bytes": deleted_bytes}
+
+    def read_record(self, blob_name: str) -> Tuple[bytes, str]:
+        with self._record_lock:
+            return self.read(blob_name), self._record_etag(blob_name)
+
+    def write_record(self, blob_name: str, data: bytes, etag: Optional[str] = None) -> str:
+        # One process owns a local store: a lock is enough
+        with self._record_lock:
+            current = self._record_etag(blob_name) if self.exists(blob_name) else None
+            if current != etag:
+                raise BlobConflictError(blob_name)
+            self.save(blob_name, data)
+            return self._record_etag(blob_name)
+
+    def _record_etag(self, blob_name: str) -> str:
+        return _stat_etag(os.stat(self._existing_path(blob_name)))
+
+    def delete_unpartitioned(self, older_than: datetime) -> Dict[str, int]:
+        cutoff = older_than.timestamp()
+        deleted = deleted_bytes = 0
+        for entry in self._iter_files():
+            if blob_partition(entry.name) or entry.name.endswith(_LOCAL_TMP_SUFFIX):
+                continue
+            stat = entry.stat()
+            if stat.st_mtime < cutoff and _remove_quietly(entry.path):
+                deleted += 1
+                deleted_bytes += stat.st_size
+        return {"deleted": deleted, "bytes": deleted_bytes}
+
+    def _iter_files(self, directory: Optional[str] = None):
+        # Every file below `directory`. Dot-directories (the write-behind
+        # spool) and top-level dot-files are not part of the store; temp
+        # files of writes in progress are (callers skip them).
+        try:
+            entries = list(os.scandir(directory or self.directory))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if not entry.name.startswith("."):
+                    yield from self._iter_files(entry.path)
+            elif entry.is_file(follow_symlinks=False) and (directory or not entry.name.startswith(".")):
+                yield entry
+
+
+def _remove_quietly(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _stat_etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+# ============================================================
+# In-memory (tests, benchmarks)
+# ============================================================
+
+class MemoryStorageBackend(StorageBackend):
+    """
+    Process-local blob store. Nothing survives a restart and nothing is
+    shared between workers: for tests and benchmarks only.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self.blobs: Dict[str, Dict[str, object]] = {}
+        self._lock = threading.Lock()
+        self._version = 0
+
+    def save(self, blob_name: str, data: bytes, cache_control: Optional[str] = None) -> str:
+        with self._lock:
+            self._store(blob_name, data, cache_control)
+        return blob_name
+
+    def _store(self, blob_name: str, data: bytes, cache_control: Optional[str]) -> Dict[str, object]:
+        self._version += 1
+        entry = self.blobs[blob_name] = {
+            "data": bytes(data),
+            "cache_control": cache_control,
+            "etag": f'"{self._version:x}-{len(data):x}"',
+            "last_modified": datetime.now(timezone.utc).replace(microsecond=0),
+        }
+        return entry
+
+    def _entry(self, blob_name: str) -> Dict[str, object]:
+        entry = self.blobs.get(blob_name)
+        if entry is None:
+            raise FileNotFoundError(blob_name)
+        return entry
+
+    def read(self, blob_name: str) -> bytes:
+        return self._entry(blob_name)["data"]
+
+    def read_range(
+        self,
+        blob_name: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+        etag: Optional[str] = None,
+    ) -> bytes:
+        entry = self._entry(blob_name)
+        if etag is not None and entry["etag"] != etag:
+            raise BlobConflictError(blob_name)
+        data = entry["data"]
+        return data[offset:] if length is None else data[offset:offset + length]
+
+    def exists(self, blob_name: str) -> bool:
+        return blob_name in self.blobs
+
+    def info(self, blob_name: str) -> Dict[str, object]:
+        entry = self._entry(blob_name)
+        return {
+            "size": len(entry["data"]),
+            "etag": entry["etag"],
+            "last_modified": entry["last_modified"],
+        }
+
+    def delete_prefix(self, prefix: str) -> Dict[str, int]:
+        with self._lock:
+            names = [name for name in self.blobs if name.startswith(prefix)]
+            deleted_bytes = sum(len(self.blobs.pop(name)["data"]) for name in names)
+        return {"deleted": len(names), "bytes": deleted_bytes}
+
+    def read_record(self, blob_name: str) -> Tuple[bytes, str]:
+        with self._lock:
+            entry = self._entry(blob_name)
+            return entry["data"], entry["etag"]
+
+    def write_record(self, blob_name: str, data: bytes, etag: Optional[str] = None) -> str:
+        with self._lock:
+            entry = self.blobs.get(blob_name)
+            if (entry["etag"] if entry is not None else None) != etag:
+                raise BlobConflictError(blob_name)
+            return self._store(blob_name, data, "no-store")["etag"]
+
+    def delete_unpartitioned(self, older_than: datetime) -> Dict[str, int]:
+        with self._lock:
+            names = [
+                name for name, entry in self.blobs.items()
+                if not blob_partition(name) and entry["last_modified"] < older_than
+            ]
+            deleted_bytes = sum(len(self.blobs.pop(name)["data"]) for name in names)
+        return {"deleted": len(names), "bytes": deleted_bytes}
+
+    # No I/O: no thread hop
+    async def save_async(self, blob_name: str, data: bytes, cache_control: Optional[str] = None) -> str:
+        return self.save(blob_name, data, cache_control)
+
+    async def read_async(self, blob_name: str) -> bytes:
+        return self.read(blob_name)
+
+    async def read_range_async(
+        self,
+        blob_name: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+        etag: Optional[str] = None,
+    ) -> bytes:
+        return self.read_range(blob_name, offset, length, etag)
+
+    async def exists_async(self, blob_name: str) -> bool:
+        return self.exists(blob_name)
+
+    async def info_async(self, blob_name: str) -> Dict[str, object]:
+        return self.info(blob_name)
+
+
+# ============================================================
+# Azure Blob Storage
+# ============================================================
+
+class AzureBlobStorageBackend(StorageBackend):
+    """
+    Azure Blob Storage with a local-directory fallback: failed uploads
+    are written locally, reads / lookups fall back to the local copy.
+    A circuit breaker skips Azure entirely after repeated failures.
+
+    One sync client per backend (created once, under a lock) and one
+    aio client per event loop, each over a pooled keep-alive transport.
+    """
+
+    name = "azure"
+
+    def __init__(self, settings: Dict[str, object]):
+        self.settings = settings
+        # Fallback copies are never evicted: they are the only copies
+        self.local = create_local_store(settings, evict=False)
+        self.breaker = CircuitBreaker(
+            "azure-blob",
+            failure_threshold=settings["breaker_failures"],
+            reset_timeout=settings["breaker_reset"],
+        )
+
+        self._container_client = None
+        self._container_created = False
+        self._container_lock = threading.Lock()
+
+        # aio clients are bound to the event loop they were created on
+        self._async_container_client = None
+        self._async_container_loop = None
+        self._async_container_created = False
+
+    # ----------------------------------------------------
+    # Clients
+    # ----------------------------------------------------
+
+    def _get_container_client(self):
+        if self._container_client is None:
+            with self._container_lock:
+                if self._container_client is None:
+                    service = BlobServiceClient.from_connection_string(
+                        self.settings["connection_string"],
+                        api_version=self.settings["api_version"],
+                        retry_policy=RetryPolicy(total_retries=3),
+                        transport=build_sync_transport(self.settings),
+                    )
+                    self._container_client = service.get_container_client(self.settings["container"])
+        return self._container_client
+
+    def _ensure_container_created(self) -> None:
+        if self._container_created:
+            return
+        with self._container_lock:
+            if self._container_created:
+                return
+            try:
+                self._get_container_client().create_container()
+            except ResourceExistsError:
+                pass
+            self._container_created = True
+
+    def _get_async_container_client(self):
+        loop = asyncio.get_running_loop()
+        if self._async_container_client is None or self._async_container_loop is not loop:
+            service = AsyncBlobServiceClient.from_connection_string(
+                self.settings["connection_string"],
+                api_version=self.settings["api_version"],
+                retry_policy=AsyncRetryPolicy(total_retries=3),
+                transport=build_async_transport(self.settings),
+            )
+            self._async_container_client = service.get_container_client(self.settings["container"])
+            self._async_container_loop = loop
+            self._async_container_created = False
+        return self._async_container_client
+
+    async def _ensure_async_container_created(self, container_client) -> None:
+        if self._async_container_created:
+            return
+        try:
+            await container_client.create_container()
+        except ResourceExistsError:
+            pass
+        self._async_container_created = True
+
+    def _content_settings(self, cache_control: Optional[str]) -> ContentSettings:
+        return ContentSettings(content_type=DOCX_CONTENT_TYPE, cache_control=cache_control)
+
+    # ----------------------------------------------------
+    # Sync API
+    # ----------------------------------------------------
+    #
+    # While the circuit is open, calls skip Azure (and its retries /
+    # timeouts) and go straight to the local directory.
+
+    def save(self, blob_name: str, data: bytes, cache_control: Optional[str] = None) -> str:
+        try:
+            self.upload(blob_name, data, cache_control)
+            return blob_name
+        except (CircuitOpenError, *_STORAGE_ERRORS):
+            return self.local.save(blob_name, data)
+
+    def upload(self, blob_name: str, data: bytes, cache_control: Optional[str] = None) -> None:
+        """
+        Upload to Azure only: raises instead of falling back to the
+        local directory (CircuitOpenError while the circuit is open).
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.breaker.name, self.breaker.retry_after())
+        container_client = self._get_container_client()
+        try:
+            self._ensure_container_created()
+            start_time = perf_counter()
+            container_client.upload_blob(
+                name=blob_name,
+                data=data,
+                overwrite=True,
+                content_settings=self._content_settings(cache_control),
+            )
+            elapsed = perf_counter() - start_time
+            _logger.info("Uploaded blob %s in %.2fs", blob_name, elapsed)
+            self.breaker.record_success()
+        except _STORAGE_ERRORS as exc:
+            self._record_error(exc)
+            raise
+
+    def read(self, blob_name: str) -> bytes:
+        if not self.breaker.allow():
+            return self._local_or_unavailable(blob_name).read(blob_name)
+        blob_client = self._get_container_client().get_blob_client(blob_name)
+        try:
+            start_time = perf_counter()
+            payload = blob_client.download_blob().readall()
+            elapsed = perf_counter() - start_time
+            _logger.info("Downloaded blob %s in %.2fs", blob_name, elapsed)
+            self.breaker.record_success()
+            return payload
+        except _STORAGE_ERRORS as exc:
+            self._record_error(exc)
+            self._raise_if_missing_everywhere(exc, blob_name)
+            return self.local.read(blob_name)
+
+    def read_range(
+        self,
+        blob_name: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+        etag: Optional[str] = None,
+    ) -> bytes:
+        if not self.breaker.allow():
+            return self._local_or_unavailable(blob_name).read_range(blob_name, offset, length, etag)
+        blob_client = self._get_container_client().get_blob_client(blob_name)
+        try:
+            payload = blob_client.download_blob(offset=offset, length=length, **_if_match(etag)).readall()
+            self.breaker.record_success()
+            return payload
+        except _STORAGE_ERRORS as exc:
+            self._record_error(exc)
+            self._raise_if_changed(exc, blob_name)
+            self._raise_if_missing_everywhere(exc, blob_name)
+            return self.local.read_range(blob_name, offset, length, etag)
+
+    def exists(self, blob_name: str) -> bool:
+        if self.local.exists(blob_name):
+            return True
+        if not self.breaker.allow():
+            return False
+        blob_client = self._get_container_client().get_blob_client(blob_name)
+        try:
+            found = blob_client.exists()
+            self.breaker.record_success()
+            return found
+        except _STORAGE_ERRORS as exc:
+            self._record_error(exc)
+            return False
+
+    def info(self, blob_name: str) -> Dict[str, object]:
+        if not self.breaker.allow():
+            return self._local_or_unavailable(blob_name).info(blob_name)
+        blob_client = self._get_container_client().get_blob_client(blob_name)
+        try:
+            props = blob_client.get_blob_properties()
+            self.breaker.record_success()
+            return self._info_from_properties(props)
+        except _STORAGE_ERRORS as exc:
+            self._record_error(exc)
+            self._raise_if_missing_everywhere(exc, blob_name)
+            return self.local.info(blob_name)
+
+    # ----------------------------------------------------
+    # Async API (azure.storage.blob.aio)
+    # ----------------------------------------------------
+
+    async def save_async(self, blob_name: str, data: bytes, cache_control: Optional[str] = None) -> str:
+        if not self.breaker.allow():
+            return await self.local.save_async(blob_name, data)
+        container_client = self._get_async_container_client()
+        try:
+            await self._ensure_async_container_created(container_client)
+            start_time = perf_counter()
+            await container_client.upload_blob(
+                name=blob_name,
+                data=data,
+                overwrite=True,
+                content_settings=self._content_settings(cache_control),
+            )
+            elapsed = perf_counter() - start_time
+            _logger.info("Uploaded blob %s in %.2fs", blob_name, elapsed)
+            self.breaker.record_success()
+            return blob_name
+        except _STORAGE_ERRORS as exc:
+            self._record_error(exc)
+            return await self.local.save_async(blob_name, data)
+
+    async def read_async(self, blob_name: str) -> bytes:
+        return await self.read_range_async(blob_name)
+
+    async def read_range_async(
+        self,
+        blob_name: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+        etag: Optional[str] = None,
+    ) -> bytes:
+        if not self.breaker.allow():
+            return await self._local_or_unavailable(blob_name).read_range_async(blob_name, offset, length, etag)
+        blob_client = self._get_async_container_client().get_blob_client(blob_name)
+        try:
+            start_time = perf_counter()
+            if offset or length is not None:
+                downloader = await blob_client.download_blob(offset=offset, length=length, **_if_match(etag))
+            else:
+                downloader = await blob_client.download_blob(**_if_match(etag))
+            chunks = [chunk async for chunk in downloader.chunks()]
+            elapsed = perf_counter() - start_time
+            _logger.info("Downloaded blob %s in %.2fs", blob_name, elapsed)
+            self.breaker.record_success()
+            return b"".join(chunks)
+        except _STORAGE_ERRORS as exc:
+            self._record_error(exc)
+            self._raise_if_changed(exc, blob_name)
+            self._raise_if_missing_everywhere(exc, blob_name)
+            return await self.local.read_range_async(blob_name, offset, length, etag)
+
+    async def exists_async(self, blob_name: str) -> bool:
+        if self.local.exists(blob_name):
+            return True
+        if not self.breaker.allow():
+            return False
+        blob_client = self._get_async_container_client().get_blob_client(blob_name)
+        try:
+            found = await blob_client.exists()
+            self.breaker.record_success()
+            return found
+        except _STORAGE_ERRORS as exc:
+            self._record_error(exc)
+            return False
+
+    async def info_async(self, blob_name: str) -> Dict[str, object]:
+        if not self.breaker.allow():
+            return await self._local_or_unavailable(blob_name).info_async(blob_name)
+        blob_client = self._get_async_container_client().get_blob_client(blob_name)
+        try:
+            props = await blob_client.get_blob_properties()
+            self.breaker.record_success()
+            return self._info_from_properties(props)
+        except _STORAGE_ERRORS as exc:
+            self._record_error(exc)
+            self._raise_if_missing_everywhere(exc, blob_name)
+            return await self.local.info_async(blob_name)
+
+    # ----------------------------------------------------
+    # Records
+    # ----------------------------------------------------
+    #
+    # Azure only: no local fallback (another instance would never see
+    # it), CircuitOpenError while the circuit is open.
+
+    def read_record(self, blob_name: str) -> Tuple[bytes, str]:
+        blob_client = self._record_blob_client(blob_name, self._get_container_client())
+        try:
+            downloader = blob_client.download_blob()
+            payload = downloader.readall()
+            self.breaker.record_success()
+            return payload, downloader.properties.etag
+        except _STORAGE_ERRORS as exc:
+            self._raise_record_error(exc, blob_name)
+
+    def write_record(self, blob_name: str, data: bytes, etag: Optional[str] = None) -> str:
+        blob_client = self._record_blob_client(blob_name, self._get_container_client())
+        try:
+            self._ensure_container_created()
+            result = blob_client.upload_blob(data, **self._record_conditions(etag))
+            self.breaker.record_success()
+            return result["etag"]
+        except _STORAGE_ERRORS as exc:
+            self._raise_record_error(exc, blob_name)
+
+    async def read_record_async(self, blob_name: str) -> Tuple[bytes, str]:
+        blob_client = self._record_blob_client(blob_name, self._get_async_container_client())
+        try:
+            downloader = await blob_client.download_blob()
+            payload = await downloader.readall()
+            self.breaker.record_success()
+            return payload, downloader.properties.etag
+        except _STORAGE_ERRORS as exc:
+            self._raise_record_error(exc, blob_name)
+
+    async def write_record_async(self, blob_name: str, data: bytes, etag: Optional[str] = None) -> str:
+        container_client = self._get_async_container_client()
+        blob_client = self._record_blob_client(blob_name, container_client)
+        try:
+            await self._ensure_async_container_created(container_client)
+            result = await blob_client.upload_blob(data, **self._record_conditions(etag))
+            self.breaker.record_success()
+            return result["etag"]
+        except _STORAGE_ERRORS as exc:
+            self._raise_record_error(exc, blob_name)
+
+    def _record_blob_client(self, blob_name: str, container_client):
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.breaker.name, self.breaker.retry_after())
+        return container_client.get_blob_client(blob_name)
+
+    @staticmethod
+    def _record_conditions(etag: Optional[str]) -> Dict[str, object]:
+        settings = ContentSettings(content_type="application/json", cache_control="no-store")
+        if etag is None:
+            # Create only: fails with 409 when the record exists
+            return {"overwrite": False, "content_settings": settings}
+        return {
+            "overwrite": True,
+            "etag": etag,
+            "match_condition": MatchConditions.IfNotModified,
+            "content_settings": settings,
+        }
+
+    def _raise_record_error(self, exc: Exception, blob_name: str) -> None:
+        self._record_error(exc)
+        if isinstance(exc, ResourceNotFoundError):
+            raise FileNotFoundError(blob_name) from exc
+        if isinstance(exc, (ResourceExistsError, ResourceModifiedError)):
+            raise BlobConflictError(blob_name) from exc
+        raise exc
+
+    # ----------------------------------------------------
+    # Lifecycle
+    # ----------------------------------------------------
+
+    def delete_prefix(self, prefix: str) -> Dict[str, int]:
+        """
+        List the blobs under `prefix` page by page and delete each page
+        with one batch request, pages in parallel; local fallback copies
+        under the prefix are deleted too. Raises on Azure errors.
+        """
+        container_client = self._get_container_client()
+        pages = container_client.list_blobs(
+            name_starts_with=prefix,
+            results_per_page=_DELETE_BATCH_SIZE,
+        ).by_page()
+
+        result = self.local.delete_prefix(prefix)
+        with ThreadPoolExecutor(max_workers=self.settings["sweep_concurrency"]) as executor:
+            futures = [
+                executor.submit(self._delete_page, container_client, [(blob.name, blob.size) for blob in page])
+                for page in pages
+            ]
+            for future in futures:
+                deleted, deleted_bytes = future.result()
+                result["deleted"] += deleted
+                result["bytes"] += deleted_bytes
+        return result
+
+    def delete_unpartitioned(self, older_than: datetime) -> Dict[str, int]:
+        """
+        Lists the whole container (unpartitioned names share no prefix);
+        each page's old unpartitioned blobs go in one batch request.
+        """
+        container_client = self._get_container_client()
+        pages = container_client.list_blobs(results_per_page=_DELETE_BATCH_SIZE).by_page()
+
+        result = self.local.delete_unpartitioned(older_than)
+        with ThreadPoolExecutor(max_workers=self.settings["sweep_concurrency"]) as executor:
+            futures = [
+                executor.submit(
+                    self._delete_page,
+                    container_client,
+                    [
+                        (blob.name, blob.size) for blob in page
+                        if not blob_partition(blob.name) and blob.last_modified < older_than
+                    ],
+                )
+                for page in pages
+            ]
+            for future in futures:
+                deleted, deleted_bytes = future.result()
+                result["deleted"] += deleted
+                result["bytes"] += deleted_bytes
+        return result
+
+    @staticmethod
+    def _delete_page(container_client, blobs: list) -> tuple:
+        if not blobs:
+            return 0, 0
+        responses = container_client.delete_blobs(
+            *(name for name, _ in blobs),
+            raise_on_any_failure=False,
+        )
+        deleted = deleted_bytes = 0
+        for (name, size), response in zip(blobs, responses):
+            if response.status_code in (200, 202):
+                deleted += 1
+                deleted_bytes += size
+            elif response.status_code != 404:  # 404: deleted meanwhile
+                _logger.warning("Could not delete blob %s (HTTP %s)", name, response.status_code)
+        return deleted, deleted_bytes
+
+    # ----------------------------------------------------
+    # Download URLs
+    # ----------------------------------------------------
+
+    def signed_url(self, blob_name: str) -> Optional[str]:
+        """
+        Read-only blob SAS, signed offline with the account key.
+        None without a key, when the blob only exists locally or while
+        the circuit is open (downloads then go through the proxy).
+        """
+        account = self.settings["signing_account"]
+        endpoint = self.settings["blob_endpoint"]
+        if account is None or endpoint is None or self._skip_direct_url(blob_name):
+            return None
+
+        account_name, account_key = account
+        container = self.settings["container"]
+        now = datetime.now(timezone.utc)
+        sas = generate_blob_sas(
+            account_name=account_name,
+            container_name=container,
+            blob_name=blob_name,
+            account_key=account_key,
+            permission=BlobSasPermissions(read=True),
+            start=now - _SAS_CLOCK_SKEW,
+            expiry=now + self.settings["url_ttl"],
+            protocol="https" if endpoint.startswith("https://") else "https,http",
+            content_disposition=f'attachment; filename="{blob_name}"',
+        )
+        return f"{endpoint}/{container}/{quote(blob_name)}?{sas}"
+
+    def public_url(self, blob_name: str) -> Optional[str]:
+        # Unsigned container URL (only readable for public containers)
+        if self._skip_direct_url(blob_name):
+            return None
+        if self.settings["has_blob_endpoint"] or self.settings["development"]:
+            return f"{self.settings['blob_endpoint']}/{self.settings['container']}/{blob_name}"
+        return None
+
+    def pool_stats(self) -> Dict[str, object]:
+        return get_pool_stats()
+
+    def breaker_stats(self) -> Dict[str, object]:
+        return self.breaker.stats()
+
+    # ----------------------------------------------------
+    # Helpers
+    # ----------------------------------------------------
+
+    def _record_error(self, exc: Exception) -> None:
+        # Only outages count: a 404 / 409 / 412 is storage answering
+        if _is_outage(exc):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def _skip_direct_url(self, blob_name: str) -> bool:
+        return self.breaker.state == OPEN or self.local.exists(blob_name)
+
+    def _local_or_unavailable(self, blob_name: str) -> LocalStorageBackend:
+        # Circuit open: the local copy, if any, is all we can serve
+        if not self.local.exists(blob_name):
+            raise CircuitOpenError(self.breaker.name, self.breaker.retry_after())
+        return self.local
+
+    @staticmethod
+    def _raise_if_changed(exc: Exception, blob_name: str) -> None:
+        # 412 on an ETag-conditioned read: the local copy is no answer
+        if isinstance(exc, ResourceModifiedError):
+            raise BlobConflictError(blob_name) from exc
+
+    def _raise_if_missing_everywhere(self, exc: Exception, blob_name: str) -> None:
+        if isinstance(exc, ResourceNotFoundError) and not self.local.exists(blob_name):
+            raise exc
+
+    @staticmethod
+    def _info_from_properties(props) -> Dict[str, object]:
+        etag = props.etag
+        return {
+            "size": props.size,
+            "etag": etag if etag.startswith('"') else f'"{etag}"',
+            "last_modified": props.last_modified,
+        }
+
+
+def _if_match(etag: Optional[str]) -> Dict[str, object]:
+    # download_blob() keyword arguments for "only this version"
+    if etag is None:
+        return {}
+    return {"etag": etag, "match_condition": MatchConditions.IfNotModified}
+
+
+def _is_outage(exc: Exception) -> bool:
+    if isinstance(exc, (ServiceRequestError, ServiceResponseError)):
+        return True
+    status = getattr(exc, "status_code", None)
+    return status is None or status >= 500 or status in (408, 429)
+
+
+# ============================================================
+# Factory
+# ============================================================
+
+def create_local_store(settings: Dict[str, object], *, evict: bool = True) -> LocalStorageBackend:
+    """
+    The local store. Its files are the only copies (STORAGE_BACKEND=local,
+    or Azure fallback copies that are never uploaded later), so eviction
+    is opt-in (LOCAL_STORE_TTL_SECONDS / LOCAL_STORE_MAX_MB), the TTL
+    never shorter than the retention period, and `evict=False` (the
+    Azure fallback) turns it off altogether.
+    """
+    ttl = settings["local_ttl"] if evict else 0
+    retention = settings["retention_days"] * 86400
+    if ttl and ttl < retention:
+        _logger.warning(
+            "LOCAL_STORE_TTL_SECONDS=%d is shorter than CONTRACT_RETENTION_DAYS, using %d",
+            ttl, retention,
+        )
+        ttl = retention
+    return LocalStorageBackend(
+        settings["local_dir"],
+        shard_chars=settings["local_shard_chars"],
+        ttl=ttl,
+        max_bytes=settings["local_max_bytes"] if evict else 0,
+        use_mmap=settings["local_mmap"],
+        sweep_interval=settings["local_sweep_interval"],
+    )
+
+
+def create_storage_backend(settings: Dict[str, object]) -> StorageBackend:
+    """
+    STORAGE_BACKEND=azure|local|memory, default: azure when
+    AzureWebJobsStorage is set, else local. STORAGE_WRITE_BEHIND=true
+    wraps the Azure backend in a write-behind upload spool.
+    """
+    kind = settings["backend"] or ("azure" if settings["connection_string"] else "local")
+    if kind == "azure":
+        if not settings["connection_string"]:
+            raise ValueError("STORAGE_BACKEND=azure requires AzureWebJobsStorage")
+        backend = AzureBlobStorageBackend(settings)
+        if settings["write_behind"] and not settings["spool_dir"]:
+            # An instance-local default would strand spooled contracts
+            # on one instance (and lose them when it is recycled)
+            _logger.warning(
+                "STORAGE_WRITE_BEHIND needs STORAGE_SPOOL_DIR on persistent, shared storage; uploading inline"
+            )
+        elif settings["write_behind"]:
+            from src.shared.write_behind import WriteBehindStorageBackend
+
+            return WriteBehindStorageBackend(backend, settings)
+        return backend
+    if kind == "local":
+        return create_local_store(settings)
+    if kind == "memory":
+        return MemoryStorageBackend()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {kind}")
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import copy
+import threading
+from typing import Dict, List, Tuple
+
+from docx.enum.table import WD_CELL_VERTICAL_ALIGNMENT, WD_ROW_HEIGHT_RULE
+from docx.oxml import OxmlElement
+from docx.oxml.ns import nsmap, qn
+from docx.oxml.table import CT_Tbl
+from docx.shared import Cm, Twips
+from docx.table import Table
+from lxml import etree
+
+# ============================================================
+# Table placeholders (list-of-rows ctx values)
+# ============================================================
+#
+# A block placeholder registered in TABLE_SPECS whose ctx value is a
+# list of rows becomes a real DOCX table, e.g.
+#
+#   ctx["MIETE_BK_TABELLE"] = [("Die Miete beträgt monatlich", "950,00 EUR"), ...]
+#
+# Styling never depends on the data, so each table is built ONCE per
+# (table key, page block width) as a skeleton:
+#
+#   - `w:tbl` with properties, grid, borders and the header row
+#   - a pre-styled data row and a pre-styled last (total) row
+#
+# A render deep-copies the skeleton and bulk-appends copies of the
+# prototype rows with the cell text filled in. No grid resolution, no
+# python-docx proxies, no per-render styling.
+#
+# The skeleton is also pre-serialized into byte chunks (see
+# `render_table_xml`) so the render-plan backend emits tables by
+# string joins, like plain text slots.
+
+TABLE_SPECS: Dict[str, Dict[str, object]] = {
+    # § 5 Miete / Betriebskosten
+    "MIETE_BK_TABELLE": {
+        "headers": ("Beschreibung", "Betrag (EUR)"),
+        "widths_cm": (12.5, 4.0),
+        "header_height_cm": 0.95,
+        "row_height_cm": 1.25,
+        "last_row_height_cm": 0.95,   # total row
+    },
+}
+
+# Block placeholders replaced by a real DOCX table
+TABLE_KEYS = tuple(TABLE_SPECS)
+
+_W_NS_DECL = f' xmlns:w="{nsmap["w"]}"'.encode()
+
+_ROWS = "table-rows"
+_LAST_ROW = "table-last-row"
+_ROWS_END = "table-rows-end"
+_CELL = "table-cell"
+
+# tblPr children that must come AFTER w:tblBorders (schema order)
+_AFTER_TBL_BORDERS = tuple(
+    qn(tag) for tag in ("w:shd", "w:tblLayout", "w:tblCellMar", "w:tblLook", "w:tblCaption", "w:tblDescription")
+)
+
+_skeleton_cache: Dict[Tuple[str, int], Dict[str, object]] = {}
+_skeleton_lock = threading.Lock()
+
+
+# ============================================================
+# Public API
+# ============================================================
+
+def is_table_value(key: str, value) -> bool:
+    """
+    True if `value` is a non-empty row list for a registered table key.
+    """
+    return key in TABLE_SPECS and isinstance(value, (list, tuple)) and len(value) > 0
+
+
+def build_table(key: str, rows, block_width) -> Table:
+    """
+    Build the table for `key` as a detached `w:tbl` element.
+    """
+    skeleton = get_table_skeleton(key, block_width)
+    rows = normalize_table_rows(key, rows)
+
+    tbl = copy.deepcopy(skeleton["tbl"])
+    last = len(rows) - 1
+    for i, values in enumerate(rows):
+        tr = copy.deepcopy(skeleton["last_row"] if i == last else skeleton["row"])
+        for tc, value in zip(tr.tc_lst, values):
+            tc.p_lst[0].add_r().text = value
+        tbl.append(tr)
+
+    return Table(tbl, None)
+
+
+def render_table_xml(key: str, rows, block_width, run_xml) -> bytes:
+    """
+    Serialize the table for `key` from the pre-serialized skeleton.
+
+    `run_xml(text)` must return the `w:r` markup python-docx writes
+    for `run.text = text` (the cell content).
+    """
+    skeleton = get_table_skeleton(key, block_width)
+    rows = normalize_table_rows(key, rows)
+
+    out: List[bytes] = [skeleton["head"]]
+    last = len(rows) - 1
+    for i, values in enumerate(rows):
+        chunks = skeleton["last_row_chunks"] if i == last else skeleton["row_chunks"]
+        out.append(chunks[0])
+        for value, chunk in zip(values, chunks[1:]):
+            out.append(run_xml(value))
+            out.append(chunk)
+    out.append(skeleton["tail"])
+
+    return b"".join(out)
+
+
+def normalize_table_rows(key: str, rows) -> List[Tuple[str, ...]]:
+    """
+    Coerce every row to exactly one string per column.
+    """
+    columns = len(TABLE_SPECS[key]["headers"])
+    normalized = []
+    for row in rows:
+        if isinstance(row, str):
+            row = (row,)
+        values = tuple("" if value is None else str(value) for value in row)[:columns]
+        normalized.append(values + ("",) * (columns - len(values)))
+    return normalized
+
+
+def get_table_skeleton(key: str, block_width) -> Dict[str, object]:
+    """
+    Return the cached skeleton of a table. Read-only.
+    """
+    cache_key = (key, int(block_width))
+
+    skeleton = _skeleton_cache.get(cache_key)
+    if skeleton is not None:
+        return skeleton
+
+    with _skeleton_lock:
+        skeleton = _skeleton_cache.get(cache_key)
+        if skeleton is None:
+            skeleton = _build_skeleton(TABLE_SPECS[key], block_width)
+            _skeleton_cache[cache_key] = skeleton
+        return skeleton
+
+
+# ============================================================
+# Skeleton construction (once per table key and block width)
+# ============================================================
+
+def _build_skeleton(spec: Dict[str, object], block_width) -> Dict[str, object]:
+    headers = spec["headers"]
+    widths_cm = spec["widths_cm"]
+
+    # Header row + data row + last row, styled like doc.add_table() output
+    table = Table(CT_Tbl.new_tbl(3, len(headers), block_width), None)
+    table.autofit = False
+
+    for cell, header in zip(table.rows[0].cells, headers):
+        cell.text = header
+
+    set_table_column_widths(table, widths_cm)
+    for grid_col, width in zip(table._tbl.tblGrid.gridCol_lst, widths_cm):
+        grid_col.w = Cm(width)
+
+    set_table_borders(table)
+
+    for row in table.rows:
+        for cell in row.cells:
+            set_cell_vertical_alignment(cell, "center")
+
+    header_row, data_row, last_row = table.rows
+    set_row_height(header_row, spec["header_height_cm"])
+    set_row_height(data_row, spec["row_height_cm"])
+    set_row_height(last_row, spec["last_row_height_cm"])
+
+    tbl = table._tbl
+    row = data_row._tr
+    last = last_row._tr
+    tbl.remove(row)
+    tbl.remove(last)
+
+    skeleton = {"tbl": tbl, "row": row, "last_row": last}
+    skeleton.update(_serialize_skeleton(tbl, row, last))
+    return skeleton
+
+
+def _serialize_skeleton(tbl, row, last_row) -> Dict[str, object]:
+    """
+    Pre-serialize the skeleton into byte chunks around the row / cell
+    content positions (processing-instruction markers, then split).
+    """
+    pattern = copy.deepcopy(tbl)
+    pattern.append(etree.ProcessingInstruction(_ROWS))
+    pattern.append(_marked_row(row))
+    pattern.append(etree.ProcessingInstruction(_LAST_ROW))
+    pattern.append(_marked_row(last_row))
+    pattern.append(etree.ProcessingInstruction(_ROWS_END))
+
+    # Detached: declares the w namespace itself; in the document the
+    # declaration is inherited from the part root.
+    xml = etree.tostring(pattern, encoding="UTF-8", xml_declaration=False).replace(_W_NS_DECL, b"", 1)
+
+    head, rest = xml.split(_marker(_ROWS))
+    row_xml, rest = rest.split(_marker(_LAST_ROW))
+    last_xml, tail = rest.split(_marker(_ROWS_END))
+
+    cell = _marker(_CELL)
+    return {
+        "head": head,
+        "row_chunks": row_xml.split(cell),
+        "last_row_chunks": last_xml.split(cell),
+        "tail": tail,
+    }
+
+
+def _marker(target: str) -> bytes:
+    return etree.tostring(etree.ProcessingInstruction(target))
+
+
+def _marked_row(tr):
+    tr = copy.deepcopy(tr)
+    for tc in tr.tc_lst:
+        tc.p_lst[0].append(etree.ProcessingInstruction(_CELL))
+    return tr
+
+
+# ============================================================
+# Table styling helpers (idempotent)
+# ============================================================
+
+def set_table_borders(table):
+    """
+    Apply full borders to a table (Word-compatible, safe).
+    """
+    tbl = table._tbl
+    tblPr = tbl.tblPr
+
+    for existing in tblPr.findall(qn("w:tblBorders")):
+        tblPr.remove(existing)
+
+    borders = OxmlElement("w:tblBorders")
+
+    for edge in ("top", "left", "bottom", "right", "insideH", "insideV"):
+        element = OxmlElement(f"w:{edge}")
+        element.set(qn("w:val"), "single")
+        element.set(qn("w:sz"), "8")       # border thickness
+        element.set(qn("w:space"), "0")
+        element.set(qn("w:color"), "000000")
+        borders.append(element)
+
+    successor = next((child for child in tblPr if child.tag in _AFTER_TBL_BORDERS), None)
+    if successor is not None:
+        successor.addprevious(borders)
+    else:
+        tblPr.append(borders)
+
+
+def set_table_column_widths(table, widths_cm):
+    """
+    widths_cm = list of column widths in centimeters
+    """
+    table.autofit = False
+
+    for row in table.rows:
+        for idx, width in enumerate(widths_cm):
+            row.cells[idx].width = Cm(width)
+
+
+def set_cell_vertical_alignment(cell, align="center"):
+    """
+    Vertically align content inside a table cell.
+    align: 'top' | 'center' | 'bottom'
+    """
+    cell._tc.get_or_add_tcPr().vAlign_val = WD_CELL_VERTICAL_ALIGNMENT.from_xml(align)
+
+
+def set_row_height(row, height_cm: float):
+    """
+    Set exact row height in centimeters.
+    """
+    row.height = Twips(int(height_cm * 567))  # cm → twips
+    row.height_rule = WD_ROW_HEIGHT_RULE.EXACTLY
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import copy
+import os
+import threading
+from typing import Callable, Dict, Tuple
+
+from docx import Document
+
+from src.shared.docx_package import read_template_package
+from src.shared.placeholder_index import build_placeholder_index, is_text_part
+
+# ============================================================
+# Process-wide parsed template cache
+# ============================================================
+#
+# Parsing a DOCX (unzip + lxml parse of every part) is the most
+# expensive fixed cost of a render. Templates are lawyer-approved
+# files that change only on deploy, so each worker parses them ONCE
+# and hands every render a private deep copy of the parsed package.
+#
+# The cache is keyed by template path and validated by file mtime
+# and size, so a replaced template is picked up without a restart.
+# Every artifact derived from a template (parsed document, placeholder
+# index, raw XML tree, ...) is stored on the entry of the template
+# version it was built from, so artifacts can never drift apart.
+
+_template_cache: Dict[str, Dict[str, object]] = {}
+_template_lock = threading.RLock()
+
+
+def _file_signature(template_path: str) -> Tuple[int, int]:
+    stat = os.stat(template_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _get_cached_entry(template_path: str) -> Dict[str, object]:
+    signature = _file_signature(template_path)
+
+    entry = _template_cache.get(template_path)
+    if entry is not None and entry["signature"] == signature:
+        return entry
+
+    with _template_lock:
+        entry = _template_cache.get(template_path)
+        if entry is not None and entry["signature"] == signature:
+            return entry
+
+        entry = {"signature": signature, "artifacts": {}}
+        _template_cache[template_path] = entry
+        return entry
+
+
+def get_compiled_template(template_path: str, kind: str, compile_fn: Callable[[str], object]):
+    """
+    Return the artifact `kind` of a template, building it once per
+    template version with `compile_fn(template_path)`.
+
+    Artifacts are shared between renders and MUST be treated as read-only.
+    """
+    artifacts = _get_cached_entry(template_path)["artifacts"]
+
+    artifact = artifacts.get(kind)
+    if artifact is not None:
+        return artifact
+
+    with _template_lock:
+        artifact = artifacts.get(kind)
+        if artifact is None:
+            artifact = compile_fn(template_path)
+            artifacts[kind] = artifact
+        return artifact
+
+
+def _compile_python_docx(template_path: str) -> Dict[str, object]:
+    # The master is kept pristine (never wrapped in proxies): python-docx
+    # proxies cache child proxies lazily (e.g. Document._body), and a
+    # deep copy of a proxy that already cached one points at a detached
+    # tree. The index only reads part elements.
+    document = Document(template_path)
+    return {
+        "document": document,
+        "index": build_placeholder_index(text_part_roots(document)),
+    }
+
+
+def text_part_roots(document) -> Dict[str, object]:
+    """
+    Map archive member name -> root element for every text part
+    (main document, headers, footers) of a python-docx document.
+    """
+    return {
+        part.partname.membername: part.element
+        for part in document.part.package.iter_parts()
+        if is_text_part(part.partname.membername)
+    }
+
+
+def load_template(template_path: str):
+    """
+    Return a private, freshly usable copy of the parsed template.
+
+    The cached master document is NEVER handed out directly:
+    renders mutate the tree, so each caller gets its own deep copy.
+    """
+    return load_template_with_index(template_path)[0]
+
+
+def load_template_with_index(template_path: str) -> Tuple[object, Dict[str, object]]:
+    """
+    Return (private document copy, placeholder index) for one template version.
+    """
+    compiled = get_compiled_template(template_path, "python-docx", _compile_python_docx)
+    return copy.deepcopy(compiled["document"]), compiled["index"]
+
+
+def load_template_package(template_path: str):
+    """
+    Return the archive entries of a template (raw compressed bytes
+    included) for zip passthrough on save. Read-only.
+    """
+    return get_compiled_template(template_path, "package", read_template_package)
+
+
+def warm_templates(template_paths) -> None:
+    """
+    Parse the given templates ahead of the first request.
+    """
+    for template_path in template_paths:
+        get_compiled_template(template_path, "python-docx", _compile_python_docx)
+        load_template_package(template_path)
+
+
+def clear_template_cache() -> None:
+    with _template_lock:
+        _template_cache.clear()
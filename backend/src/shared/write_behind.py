@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import threading
+import uuid
+from datetime import datetime
+from time import monotonic, sleep
+from typing import Dict, Optional, Tuple
+
+from src.shared.circuit_breaker import CircuitOpenError
+from src.shared.storage_backends import LocalStorageBackend, StorageBackend
+
+_logger = logging.getLogger(__name__)
+
+# ============================================================
+# Write-behind uploads (local spool + background uploader)
+# ============================================================
+#
+# save() writes the bytes to a local spool directory (fsync + atomic
+# rename) and returns; background threads upload spooled blobs to Azure
+# and delete the spool file once the upload is confirmed. Until then
+# reads / lookups are served from the spool and no direct storage URL
+# is handed out (downloads go through /api/download_contract).
+#
+# A failed upload stays in the spool and is retried with backoff (and
+# after the circuit breaker's reset time while it is open): nothing is
+# dropped. Blobs left in the spool by a previous process are queued
+# again when the uploader starts.
+#
+# Settings:
+#   STORAGE_WRITE_BEHIND=true       enable (Azure backend only)
+#   STORAGE_SPOOL_DIR               required: a persistent directory
+#                                   every instance sees (e.g. under
+#                                   /home on Azure Functions); without
+#                                   it write-behind stays off
+#   STORAGE_UPLOAD_WORKERS          uploader threads (default 4)
+#   STORAGE_SPOOL_MAX_PENDING       queued uploads before save() uploads
+#                                   inline again (default 256)
+
+_META_SUFFIX = ".upload.json"
+_TMP_SUFFIX = ".tmp"
+
+_RETRY_BASE_SECONDS = 1.0
+_RETRY_MAX_SECONDS = 60.0
+
+
+class WriteBehindStorageBackend(StorageBackend):
+    """
+    Spools saves locally and uploads them to `remote` (an Azure
+    backend, which provides upload()) in the background.
+    """
+
+    name = "azure-write-behind"
+
+    def __init__(self, remote: StorageBackend, settings: Dict[str, object]):
+        self.remote = remote
+        self.spool = LocalStorageBackend(settings["spool_dir"])
+        self.workers = settings["upload_workers"]
+        self.max_pending = settings["spool_max_pending"]
+
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._pending: set = set()
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._threads: list = []
+        self._counters = {"spooled": 0, "uploaded": 0, "retries": 0, "inline": 0}
+
+    # ----------------------------------------------------
+    # Writes
+    # ----------------------------------------------------
+
+    def save(self, blob_name: str, data: bytes, cache_control: Optional[str] = None) -> str:
+        self._ensure_started()
+        with self._lock:
+            if len(self._pending) >= self.max_pending and blob_name not in self._pending:
+                self._counters["inline"] += 1
+                spool_full = True
+            else:
+                spool_full = False
+        if spool_full:
+            # Uploader is behind (or storage down): back-pressure
+            return self.remote.save(blob_name, data, cache_control)
+
+        self._write_spool(blob_name, data, cache_control)
+        self._enqueue(blob_name)
+        with self._lock:
+            self._counters["spooled"] += 1
+        return blob_name
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every spooled blob is uploaded. False on timeout.
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+        with self._drained:
+            while self._pending:
+                remaining = None if deadline is None else deadline - monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._drained.wait(remaining)
+        return True
+
+    # ----------------------------------------------------
+    # Reads: spool first, then the remote backend
+    # ----------------------------------------------------
+
+    def read(self, blob_name: str) -> bytes:
+        try:
+            return self.spool.read(blob_name)
+        except FileNotFoundError:
+            return self.remote.read(blob_name)
+
+    def read_range(
+        self,
+        blob_name: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+        etag: Optional[str] = None,
+    ) -> bytes:
+        try:
+            return self.spool.read_range(blob_name, offset, length, etag)
+        except FileNotFoundError:
+            return self.remote.read_range(blob_name, offset, length, etag)
+
+    def exists(self, blob_name: str) -> bool:
+        return self.spool.exists(blob_name) or self.remote.exists(blob_name)
+
+    def info(self, blob_name: str) -> Dict[str, object]:
+        try:
+            return self.spool.info(blob_name)
+        except FileNotFoundError:
+            return self.remote.info(blob_name)
+
+    async def read_async(self, blob_name: str) -> bytes:
+        if self.spool.exists(blob_name):
+            try:
+                return await self.spool.read_async(blob_name)
+            except FileNotFoundError:
+                pass  # uploaded meanwhile
+        return await self.remote.read_async(blob_name)
+
+    async def read_range_async(
+        self,
+        blob_name: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+        etag: Optional[str] = None,
+    ) -> bytes:
+        if self.spool.exists(blob_name):
+            try:
+                return await self.spool.read_range_async(blob_name, offset, length, etag)
+            except FileNotFoundError:
+                pass
+        return await self.remote.read_range_async(blob_name, offset, length, etag)
+
+    async def exists_async(self, blob_name: str) -> bool:
+        return self.spool.exists(blob_name) or await self.remote.exists_async(blob_name)
+
+    async def info_async(self, blob_name: str) -> Dict[str, object]:
+        try:
+            return self.spool.info(blob_name)
+        except FileNotFoundError:
+            return await self.remote.info_async(blob_name)
+
+    # Records are never spooled
+    def read_record(self, blob_name: str) -> Tuple[bytes, str]:
+        return self.remote.read_record(blob_name)
+
+    def write_record(self, blob_name: str, data: bytes, etag: Optional[str] = None) -> str:
+        return self.remote.write_record(blob_name, data, etag)
+
+    async def read_record_async(self, blob_name: str) -> Tuple[bytes, str]:
+        return await self.remote.read_record_async(blob_name)
+
+    async def write_record_async(self, blob_name: str, data: bytes, etag: Optional[str] = None) -> str:
+        return await self.remote.write_record_async(blob_name, data, etag)
+
+    def signed_url(self, blob_name: str) -> Optional[str]:
+        # Not in Azure yet: serve it through the proxy
+        if self.spool.exists(blob_name):
+            return None
+        return self.remote.signed_url(blob_name)
+
+    def public_url(self, blob_name: str) -> Optional[str]:
+        if self.spool.exists(blob_name):
+            return None
+        return self.remote.public_url(blob_name)
+
+    def delete_prefix(self, prefix: str) -> Dict[str, int]:
+        # Uploads still pending are kept: they are newer than any
+        # expired partition unless storage was down for that long
+        return self.remote.delete_prefix(prefix)
+
+    def delete_unpartitioned(self, older_than: datetime) -> Dict[str, int]:
+        return self.remote.delete_unpartitioned(older_than)
+
+    # ----------------------------------------------------
+    # Stats
+    # ----------------------------------------------------
+
+    def pool_stats(self) -> Dict[str, object]:
+        return self.remote.pool_stats()
+
+    def breaker_stats(self) -> Optional[Dict[str, object]]:
+        return self.remote.breaker_stats()
+
+    def spool_stats(self) -> Optional[Dict[str, object]]:
+        with self._lock:
+            return {"pending": len(self._pending), **self._counters}
+
+    # ----------------------------------------------------
+    # Spool files
+    # ----------------------------------------------------
+
+    def _write_spool(self, blob_name: str, data: bytes, cache_control: Optional[str]) -> None:
+        meta_tmp = self._write_tmp(blob_name + _META_SUFFIX, json.dumps({"cache_control": cache_control}).encode())
+        data_tmp = self._write_tmp(blob_name, data)
+        # Renamed together under the lock the uploader holds while it
+        # checks and deletes a confirmed upload
+        with self._lock:
+            os.replace(meta_tmp, self.spool.path(blob_name + _META_SUFFIX))
+            os.replace(data_tmp, self.spool.path(blob_name))
+
+    def _write_tmp(self, name: str, data: bytes) -> str:
+        # Date-partitioned names live in a <YYYYMMDD>/ directory
+        os.makedirs(os.path.dirname(self.spool.path(name)), exist_ok=True)
+        # Unique across threads, processes and instances sharing the spool
+        tmp_path = f"{self.spool.path(name)}.{os.getpid()}-{uuid.uuid4().hex}{_TMP_SUFFIX}"
+        with open(tmp_path, "wb") as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        return tmp_path
+
+    def _read_cache_control(self, blob_name: str) -> Optional[str]:
+        try:
+            with open(self.spool.path(blob_name + _META_SUFFIX), "rb") as handle:
+                return json.loads(handle.read()).get("cache_control")
+        except (OSError, ValueError):
+            return None
+
+    def _spool_version(self, blob_name: str) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.spool.path(blob_name))
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _remove_spooled(self, blob_name: str) -> None:
+        for name in (blob_name, blob_name + _META_SUFFIX):
+            try:
+                os.remove(self.spool.path(name))
+            except FileNotFoundError:
+                pass
+
+    # ----------------------------------------------------
+    # Uploader
+    # ----------------------------------------------------
+
+    def _ensure_started(self) -> None:
+        # Started on first use, not at import: the render pool forks
+        # after storage is configured and must not inherit the threads.
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._upload_loop,
+                    name=f"blob-upload-{index}",
+                    daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+        self._recover()
+
+    def _recover(self) -> None:
+        leftovers = []
+        for entry in self.spool._iter_files():
+            name = entry.name
+            if name.startswith(".") or name.endswith(_META_SUFFIX) or name.endswith(_TMP_SUFFIX):
+                continue
+            try:
+                path = self.spool.path(name)
+            except ValueError:
+                continue
+            if entry.path != path:
+                continue
+            leftovers.append(name)
+        for name in leftovers:
+            self._enqueue(name)
+        if leftovers:
+            _logger.info("Re-queued %d spooled upload(s) from a previous run", len(leftovers))
+
+    def _enqueue(self, blob_name: str) -> None:
+        with self._lock:
+            if blob_name in self._pending:
+                return
+            self._pending.add(blob_name)
+        self._queue.put(blob_name)
+
+    def _upload_loop(self) -> None:
+        while True:
+            blob_name = self._queue.get()
+            try:
+                self._upload_until_done(blob_name)
+            except Exception:
+                # Never lose the worker; the file stays spooled
+                _logger.exception("Unexpected error uploading spooled blob %s", blob_name)
+                with self._lock:
+                    self._pending.discard(blob_name)
+                self._enqueue(blob_name)
+                sleep(_RETRY_MAX_SECONDS)
+
+    def _upload_until_done(self, blob_name: str) -> None:
+        attempt = 0
+        while True:
+            version = self._spool_version(blob_name)
+            try:
+                if version is None:
+                    raise FileNotFoundError(blob_name)
+                data = self.spool.read(blob_name)
+            except FileNotFoundError:
+                self._finish(blob_name, uploaded=False)
+                return
+
+            try:
+                self.remote.upload(blob_name, data, self._read_cache_control(blob_name))
+            except CircuitOpenError as exc:
+                delay = max(_RETRY_BASE_SECONDS, exc.retry_after)
+            except Exception as exc:
+                delay = min(_RETRY_MAX_SECONDS, _RETRY_BASE_SECONDS * 2 ** attempt)
+                _logger.warning(
+                    "Upload of spooled blob %s failed (%s), retrying in %.0fs",
+                    blob_name, type(exc).__name__, delay,
+                )
+            else:
+                with self._lock:
+                    # Saved again during the upload: upload the new bytes
+                    replaced = self._spool_version(blob_name) != version
+                    if not replaced:
+                        self._remove_spooled(blob_name)
+                if not replaced:
+                    self._finish(blob_name, uploaded=True)
+                    return
+                attempt = 0
+                continue
+
+            attempt += 1
+            with self._lock:
+                self._counters["retries"] += 1
+            sleep(delay)
+
+    def _finish(self, blob_name: str, uploaded: bool) -> None:
+        with self._drained:
+            self._pending.discard(blob_name)
+            if uploaded:
+                self._counters["uploaded"] += 1
+            # Saved again after the upload was confirmed
+            requeue = self.spool.exists(blob_name)
+            self._drained.notify_all()
+        if requeue:
+            self._enqueue(blob_name)
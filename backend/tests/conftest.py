@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import os
+import sys
+
+# Tests import the function apps and src/ like the Functions host does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+import pytest  # noqa: E402
+
+from src.shared import result_cache  # noqa: E402
+from src.shared.storage import set_storage_backend  # noqa: E402
+from src.shared.storage_backends import MemoryStorageBackend  # noqa: E402
+
+SAMPLE_BODY = {
+    "maskA": {
+        "rolle": "Vermieter",
+        "eigene_name": "Max Muster",
+        "eigene_anschrift": "Hauptstr. 1, 10115 Berlin",
+        "gegenpartei_name": "Erika Mieter",
+        "gegenpartei_anschrift": "Nebenweg 2, 10115 Berlin",
+        "objektadresse": "Hauptstr. 1, 10115 Berlin",
+        "wohnung_bez": "3-Zimmer-Wohnung",
+        "wohnflaeche": "75.5",
+        "grundmiete": "1000",
+        "vz_heizung": "80",
+        "vz_bk": "120",
+        "eigene_iban": "DE89370400440532013000",
+        "kaution": "3",
+        "mietbeginn": "2026-01-01",
+    },
+    "maskB": {
+        "vertragsart_final": "unbefristet",
+        "ro_mietbeginn": "2026-01-01",
+        "ro_grundmiete": "1000",
+        "kaution": "3",
+    },
+}
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    """
+    Fresh in-memory storage, with no result remembered from earlier tests.
+    """
+    backend = MemoryStorageBackend()
+    monkeypatch.setattr(result_cache, "_known_results", {})
+    set_storage_backend(backend)
+    yield backend
+    set_storage_backend(None)
+
+
+@pytest.fixture
+def sample_body():
+    return dict(SAMPLE_BODY, maskA=dict(SAMPLE_BODY["maskA"]), maskB=dict(SAMPLE_BODY["maskB"]))
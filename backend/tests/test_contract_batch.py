@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import zipfile
+
+import azure.functions as func
+
+import generate_contract_batch
+from src.shared.contract_service import prepare_contract
+from src.shared.storage import set_storage_backend
+
+
+def _batch(items, output: str) -> func.HttpResponse:
+    request = func.HttpRequest(
+        "POST",
+        "http://localhost/api/generate_contract_batch",
+        body=json.dumps({"items": items, "output": output}).encode("utf-8"),
+    )
+    return asyncio.run(generate_contract_batch.main(request))
+
+
+def test_zip_renders_again_when_cached_blob_is_gone(storage, sample_body):
+    manifest = json.loads(_batch([sample_body], "manifest").get_body())
+    assert manifest["ok"]
+
+    # Result still remembered as stored, but its blob was deleted (and
+    # is no longer in the hot cache)
+    job, _ = prepare_contract(sample_body)
+    del storage.blobs[job["fileId"]]
+    set_storage_backend(storage)
+
+    response = _batch([sample_body, sample_body], "zip")
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.get_body())) as archive:
+        assert len(archive.namelist()) == 2
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import azure.functions as func
+import pytest
+
+import contract_job_status
+from src.shared import contract_jobs
+from src.shared.contract_service import prepare_contract
+
+
+@pytest.fixture(autouse=True)
+def local_queue(monkeypatch, storage):
+    monkeypatch.setenv("CONTRACT_JOB_QUEUE", "local")
+
+
+def _status_request(job_id: str) -> func.HttpRequest:
+    return func.HttpRequest(
+        "GET",
+        "http://localhost/api/contract_job_status",
+        body=b"",
+        params={"id": job_id},
+    )
+
+
+def _submit_and_drain(body):
+    async def run():
+        job, error = prepare_contract(body)
+        assert error is None
+        submitted = await contract_jobs.submit_job(job)
+        await contract_jobs.drain_local_jobs()
+        return job, submitted, await contract_jobs.read_job_status(submitted["jobId"])
+
+    return asyncio.run(run())
+
+
+def test_submit_process_done(storage, sample_body):
+    job, submitted, record = _submit_and_drain(sample_body)
+
+    assert submitted["status"] == contract_jobs.PENDING
+    assert record["status"] == contract_jobs.DONE
+    assert record["fileId"] == job["fileId"]
+    assert storage.exists(record["fileId"])
+
+    response = asyncio.run(contract_job_status.main(_status_request(submitted["jobId"])))
+    payload = json.loads(response.get_body())
+    assert response.status_code == 200
+    assert payload["status"] == contract_jobs.DONE
+    assert payload["downloadUrl"]
+
+
+def test_cached_result_is_done_at_once(sample_body):
+    _submit_and_drain(sample_body)
+    _, submitted, _ = _submit_and_drain(sample_body)
+
+    assert submitted["status"] == contract_jobs.DONE
+    assert submitted["cached"] is True
+
+
+def test_redelivery_keeps_finished_record(monkeypatch, sample_body):
+    _, submitted, record = _submit_and_drain(sample_body)
+
+    async def render_again(job, wait=False):
+        raise AssertionError("finished job rendered again")
+
+    monkeypatch.setattr(contract_jobs, "render_contract", render_again)
+    message = json.dumps({"jobId": submitted["jobId"], "createdAt": submitted["createdAt"], "job": {}})
+    asyncio.run(contract_jobs.process_job_message(message))
+
+    assert asyncio.run(contract_jobs.read_job_status(submitted["jobId"])) == record
+
+
+def test_last_attempt_records_failed(monkeypatch, sample_body):
+    async def broken_render(job, wait=False):
+        raise RuntimeError("render failed")
+
+    monkeypatch.setattr(contract_jobs, "render_contract", broken_render)
+    monkeypatch.setattr(contract_jobs, "MAX_ATTEMPTS", 1)
+    _, _, record = _submit_and_drain(sample_body)
+
+    assert record["status"] == contract_jobs.FAILED
+    assert record["attempts"] == 1
+
+
+def test_status_unknown_job_is_404():
+    response = asyncio.run(contract_job_status.main(_status_request(f"20260101-{'0' * 32}")))
+    assert response.status_code == 404
+
+
+def test_status_storage_error_is_503(monkeypatch, storage):
+    def broken_read(blob_name):
+        raise OSError("storage down")
+
+    monkeypatch.setattr(storage, "read_record", broken_read)
+    response = asyncio.run(contract_job_status.main(_status_request(f"20260101-{'0' * 32}")))
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
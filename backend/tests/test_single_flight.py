@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import azure.functions as func
+import pytest
+
+import generate_contract
+from src.shared import contract_service
+from src.shared.single_flight import SingleFlight
+from src.shared.storage import set_storage_backend
+from src.shared.storage_backends import MemoryStorageBackend
+
+BURST = 20
+
+
+class _CountingStore(MemoryStorageBackend):
+    def __init__(self):
+        super().__init__()
+        self.uploads = 0
+
+    async def save_async(self, blob_name, data, cache_control=None):
+        self.uploads += 1
+        return await super().save_async(blob_name, data, cache_control)
+
+
+@pytest.fixture
+def counting_store(storage):
+    store = _CountingStore()
+    set_storage_backend(store)
+    return store
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    counts = {"renders": 0}
+    render = contract_service.render_docx_async
+
+    async def counting_render(template_path, ctx):
+        counts["renders"] += 1
+        return await render(template_path, ctx)
+
+    monkeypatch.setattr(contract_service, "render_docx_async", counting_render)
+    return counts
+
+
+def _burst(body, inline: bool):
+    request = func.HttpRequest(
+        "POST",
+        "http://localhost/api/generate_contract",
+        body=json.dumps(body).encode("utf-8"),
+        params={"inline": "true"} if inline else {},
+    )
+
+    async def run():
+        responses = await asyncio.gather(*(generate_contract.main(request) for _ in range(BURST)))
+        # Inline mode stores in the background, after the responses
+        await contract_service.drain_background_saves()
+        return responses
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("cache_enabled", ["true", "false"])
+def test_identical_burst_renders_and_uploads_once(monkeypatch, counting_store, renders, sample_body, cache_enabled):
+    monkeypatch.setenv("RESULT_CACHE_ENABLED", cache_enabled)
+    responses = _burst(sample_body, inline=False)
+
+    assert {response.status_code for response in responses} == {200}
+    assert len({json.loads(response.get_body())["fileId"] for response in responses}) == 1
+    assert renders["renders"] == 1
+    assert counting_store.uploads == 1
+
+
+def test_identical_inline_burst_renders_and_uploads_once(monkeypatch, counting_store, renders, sample_body):
+    monkeypatch.setenv("RESULT_CACHE_ENABLED", "true")
+    responses = _burst(sample_body, inline=True)
+
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.get_body() for response in responses}) == 1
+    assert renders["renders"] == 1
+    assert counting_store.uploads == 1
+
+
+def test_failure_is_shared_and_key_released():
+    flight = SingleFlight()
+    calls = 0
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def run():
+        results = await asyncio.gather(*(flight.do("key", failing) for _ in range(5)), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert flight.stats()["in_flight"] == 0
+        await asyncio.gather(flight.do("key", failing), return_exceptions=True)
+
+    asyncio.run(run())
+    assert calls == 2